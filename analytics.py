@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+SQLite analytics store for Token HUD usage
+Raw usage events with minute, hour and day rollups maintained by triggers
+on insert, so reports over months of data only touch the small rollup tables
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from transcript_ingest import TranscriptTailer
+from usage_log import UsageLog, session_hash
+
+DB_FILE = Path.home() / '.claude' / 'token_hud.db'
+
+# The analytics importer tails transcripts independently of the HUD
+INGEST_STATE_FILE = Path.home() / '.claude' / 'token_hud_analytics_ingest.json'
+
+# Raw events older than this are dropped; rollups are kept forever
+RETENTION_DAYS = 30
+
+TOKEN_COLUMNS = (
+    'tokens',
+    'input_tokens',
+    'output_tokens',
+    'cache_creation_input_tokens',
+    'cache_read_input_tokens'
+)
+
+RESOLUTIONS = {
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400
+}
+
+def _rollup_sql(resolution, seconds):
+    columns = ', '.join(TOKEN_COLUMNS)
+    values = ', '.join(f"NEW.{column}" for column in TOKEN_COLUMNS)
+    updates = ', '.join(f"{column} = {column} + excluded.{column}" for column in TOKEN_COLUMNS)
+    return f"""
+        CREATE TABLE IF NOT EXISTS rollup_{resolution} (
+            bucket INTEGER NOT NULL,
+            project TEXT NOT NULL,
+            events INTEGER NOT NULL,
+            {' INTEGER NOT NULL, '.join(TOKEN_COLUMNS)} INTEGER NOT NULL,
+            PRIMARY KEY (bucket, project)
+        ) WITHOUT ROWID;
+
+        CREATE TRIGGER IF NOT EXISTS events_rollup_{resolution} AFTER INSERT ON events
+        BEGIN
+            INSERT INTO rollup_{resolution} (bucket, project, events, {columns})
+            VALUES (CAST(NEW.ts / {seconds} AS INTEGER) * {seconds}, NEW.project, 1, {values})
+            ON CONFLICT (bucket, project) DO UPDATE SET
+                events = events + 1, {updates};
+        END;
+    """
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY,
+        ts REAL NOT NULL,
+        project TEXT NOT NULL,
+        session TEXT NOT NULL,
+        tokens INTEGER NOT NULL,
+        input_tokens INTEGER NOT NULL DEFAULT 0,
+        output_tokens INTEGER NOT NULL DEFAULT 0,
+        cache_creation_input_tokens INTEGER NOT NULL DEFAULT 0,
+        cache_read_input_tokens INTEGER NOT NULL DEFAULT 0,
+        source TEXT
+    );
+    CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+    CREATE INDEX IF NOT EXISTS events_project_ts ON events (project, ts);
+
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value
+    );
+
+    CREATE TABLE IF NOT EXISTS log_sessions (
+        session_key INTEGER PRIMARY KEY,
+        used INTEGER NOT NULL
+    );
+
+    -- Sessions already counted from transcripts; their log snapshots are skipped
+    CREATE TABLE IF NOT EXISTS transcript_sessions (
+        session_key INTEGER PRIMARY KEY
+    );
+""" + ''.join(_rollup_sql(name, seconds) for name, seconds in RESOLUTIONS.items())
+
+def to_signed(key):
+    """SQLite integers are signed 64-bit; session hashes are unsigned"""
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+def parse_timestamp(value):
+    """Transcript ISO-8601 timestamp to epoch seconds, or now if missing"""
+    if not value:
+        return time.time()
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return time.time()
+
+class AnalyticsStore:
+    def __init__(self, db_file=DB_FILE):
+        Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(db_file)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+        self.db.executescript(SCHEMA)
+
+        # Databases created before events had a source column
+        if 'source' not in {row[1] for row in self.db.execute('PRAGMA table_info(events)')}:
+            self.db.execute('ALTER TABLE events ADD COLUMN source TEXT')
+        # Identifies the usage log record an event came from; NULL for transcripts
+        self.db.execute('CREATE UNIQUE INDEX IF NOT EXISTS events_source ON events (source)')
+
+    def get_meta(self, key, default=None):
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_meta(self, key, value):
+        self.db.execute(
+            'INSERT INTO meta (key, value) VALUES (?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value',
+            (key, value)
+        )
+
+    def insert_events(self, events):
+        """Insert (ts, project, session, tokens, input, output, cache_creation, cache_read) rows"""
+        with self.db:
+            cursor = self.db.executemany(
+                'INSERT INTO events (ts, project, session, ' + ', '.join(TOKEN_COLUMNS) + ') '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                events
+            )
+        return cursor.rowcount
+
+    def import_transcripts(self, tailer=None):
+        """Add one event per new assistant message in the Claude Code transcripts"""
+        tailer = tailer or TranscriptTailer(state_file=INGEST_STATE_FILE, save_interval=float('inf'))
+        events = []
+        for record in tailer.poll():
+            events.append((
+                parse_timestamp(record['timestamp']),
+                record['project'],
+                record['session'],
+                record['input_tokens'] + record['output_tokens']
+                + record['cache_creation_input_tokens'] + record['cache_read_input_tokens'],
+                record['input_tokens'],
+                record['output_tokens'],
+                record['cache_creation_input_tokens'],
+                record['cache_read_input_tokens']
+            ))
+
+        with self.db:
+            self.db.executemany(
+                'INSERT OR IGNORE INTO transcript_sessions (session_key) VALUES (?)',
+                {(to_signed(session_hash(event[2])),) for event in events}
+            )
+        inserted = self.insert_events(events)
+        # Offsets are only saved once their events are stored
+        tailer.flush()
+        return inserted
+
+    def import_usage_log(self, log=None):
+        """Turn update_tokens.py snapshots into usage events
+
+        Each snapshot's increase in 'used' over the previous snapshot of the
+        same session becomes an event; a drop means a fresh context, whose
+        whole 'used' counts. Sessions the HUD ingested from transcripts are
+        skipped, since import_transcripts already counts them per message.
+
+        Progress is kept as a UsageLog.read_after() cursor. Every event
+        carries the identity of its snapshot in a unique source column, so
+        a record read twice is ignored rather than counted again.
+        """
+        log = log or UsageLog()
+        stored = self.get_meta('usage_log_cursor')
+        cursor = tuple(json.loads(stored)) if stored else None
+        # Stores from before the cursor only recorded the newest timestamp
+        legacy_since = self.get_meta('usage_log_ts') if cursor is None else None
+        last_used = {
+            key & ((1 << 64) - 1): used
+            for key, used in self.db.execute('SELECT session_key, used FROM log_sessions')
+        }
+        skip = {
+            key & ((1 << 64) - 1)
+            for key, in self.db.execute('SELECT session_key FROM transcript_sessions')
+        }
+
+        events = []
+        newest = cursor
+        for newest, (timestamp, used, total, remaining, percentage, key) in log.read_after(cursor):
+            if key in skip or (legacy_since is not None and timestamp <= legacy_since):
+                continue
+            previous = last_used.get(key)
+            delta = used if previous is None or used < previous else used - previous
+            last_used[key] = used
+            if delta:
+                source = f"log:{key:016x}:{timestamp!r}:{used}"
+                events.append((timestamp, 'update_tokens', f"{key:016x}", delta, 0, 0, 0, 0, source))
+
+        if newest == cursor:
+            return 0
+
+        # Events, per-session state and cursor commit together
+        with self.db:
+            inserted = self.db.executemany(
+                'INSERT OR IGNORE INTO events (ts, project, session, '
+                + ', '.join(TOKEN_COLUMNS) + ', source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                events
+            ).rowcount
+            self.db.executemany(
+                'INSERT INTO log_sessions (session_key, used) VALUES (?, ?) '
+                'ON CONFLICT (session_key) DO UPDATE SET used = excluded.used',
+                [(to_signed(key), used) for key, used in last_used.items()]
+            )
+            self.set_meta('usage_log_cursor', json.dumps(newest))
+        return inserted
+
+    def prune(self, retention_days=RETENTION_DAYS):
+        """Drop raw events older than the retention period; rollups stay"""
+        cutoff = time.time() - retention_days * 86400
+        with self.db:
+            return self.db.execute('DELETE FROM events WHERE ts < ?', (cutoff,)).rowcount
+
+    def report(self, days=90, resolution='day', project=None):
+        """Return (bucket, project, events, tokens, input, output, cache_creation, cache_read) rows"""
+        since = time.time() - days * 86400
+        query = (
+            f"SELECT bucket, project, events, {', '.join(TOKEN_COLUMNS)} "
+            f"FROM rollup_{resolution} WHERE bucket >= ?"
+        )
+        params = [since - since % RESOLUTIONS[resolution]]
+        if project is not None:
+            query += ' AND project = ?'
+            params.append(project)
+        query += ' ORDER BY bucket, project'
+        return self.db.execute(query, params).fetchall()
+
+    def close(self):
+        self.db.close()
+
+def format_bucket(bucket, resolution):
+    moment = datetime.fromtimestamp(bucket, timezone.utc)
+    if resolution == 'day':
+        return moment.strftime('%Y-%m-%d')
+    return moment.strftime('%Y-%m-%d %H:%M')
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='tokenhud report',
+        description="Token usage per project from the analytics store (UTC buckets)"
+    )
+    parser.add_argument('--days', type=int, default=90, help="how far back to report (default: 90)")
+    parser.add_argument('--resolution', choices=RESOLUTIONS, default='day')
+    parser.add_argument('--project', help="only this project")
+    parser.add_argument('--retention-days', type=int, default=RETENTION_DAYS,
+                        help=f"drop raw events older than this (default: {RETENTION_DAYS})")
+    parser.add_argument('--no-sync', action='store_true',
+                        help="report without importing new transcript and log data first")
+    args = parser.parse_args()
+
+    store = AnalyticsStore()
+    if not args.no_sync:
+        start = time.perf_counter()
+        imported = store.import_transcripts() + store.import_usage_log()
+        pruned = store.prune(args.retention_days)
+        print(f"Imported {imported:,} events, pruned {pruned:,} "
+              f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    start = time.perf_counter()
+    rows = store.report(args.days, args.resolution, args.project)
+    elapsed = (time.perf_counter() - start) * 1000
+    store.close()
+
+    print(f"{'Period':<17} {'Project':<40} {'Messages':>9} {'Tokens':>14} {'Output':>12}")
+    for bucket, project, events, tokens, input_tokens, output_tokens, *cache in rows:
+        print(f"{format_bucket(bucket, args.resolution):<17} {project[-40:]:<40} "
+              f"{events:>9,} {tokens:>14,} {output_tokens:>12,}")
+    print(f"{len(rows):,} rows in {elapsed:.1f} ms")
+
+if __name__ == '__main__':
+    main()
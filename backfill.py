@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Parallel backfill of historical transcript usage
+Scans every Claude Code transcript with a process pool and writes a compact
+summary the HUD can load at startup instead of reading months of history
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from transcript_ingest import (
+    PROJECTS_DIR, STATE_FILE, USAGE_FIELDS, find_transcripts, parse_usage_line
+)
+from update_tokens import write_status_file
+
+SUMMARY_FILE = Path.home() / '.claude' / 'token_hud_summary.json'
+
+# Sessions whose transcript changed this recently are listed in the summary
+RECENT_SECONDS = 24 * 3600
+
+def empty_totals():
+    totals = {field: 0 for field in USAGE_FIELDS}
+    totals['messages'] = 0
+    return totals
+
+def add_record(totals, record):
+    for field in USAGE_FIELDS:
+        totals[field] += record[field]
+    totals['messages'] += 1
+
+def scan_file(path):
+    """Aggregate one transcript; runs in a worker process
+
+    Returns None for a transcript deleted or rotated mid-scan, so one
+    vanished file does not abort the whole backfill.
+    """
+    try:
+        return scan_transcript(path)
+    except (OSError, ValueError) as e:
+        # ValueError: mmap of a file truncated to zero after the stat
+        print(f"Error scanning {path}, skipped: {e}", file=sys.stderr)
+        return None
+
+def scan_transcript(path):
+    """Aggregate one transcript from a read-only mapping
+
+    Only lines containing a usage key are located (by searching the mapping)
+    and decoded.
+    """
+    st = os.stat(path)
+    project = os.path.basename(os.path.dirname(path))
+    partial = {
+        'path': path,
+        'bytes': st.st_size,
+        'projects': {project: empty_totals()},
+        'days': {},
+        'session': None,
+        'state': {'inode': [st.st_dev, st.st_ino], 'offset': 0}
+    }
+    if st.st_size == 0:
+        return partial
+
+    last = None
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # Stop at the last newline; a partial line is left for the tailer
+        size = mm.rfind(b'\n') + 1
+        pos = mm.find(b'"usage"', 0, size)
+        while pos != -1:
+            start = mm.rfind(b'\n', 0, pos) + 1
+            end = mm.find(b'\n', pos, size)
+            record = parse_usage_line(mm[start:end], project)
+
+            if record is not None and (last is None or record['message_id'] != last['message_id']):
+                add_record(partial['projects'][project], record)
+                day = (record['timestamp'] or 'unknown')[:10]
+                add_record(partial['days'].setdefault(day, empty_totals()), record)
+                last = record
+            pos = mm.find(b'"usage"', end, size)
+
+    partial['state']['offset'] = size
+    if last is not None:
+        partial['state']['last_message_id'] = last['message_id']
+        partial['session'] = {
+            'id': last['session'],
+            'project': project,
+            'context': last['context'],
+            'updated_at': st.st_mtime
+        }
+    return partial
+
+def merge(summary, partial, recent_after):
+    """Fold one file's partial aggregate into the running summary"""
+    summary['files'] += 1
+    summary['bytes'] += partial['bytes']
+
+    for project, totals in partial['projects'].items():
+        merged = summary['projects'].setdefault(project, empty_totals())
+        for field, value in totals.items():
+            merged[field] += value
+            summary['totals'][field] += value
+
+    for day, totals in partial['days'].items():
+        merged = summary['days'].setdefault(day, empty_totals())
+        for field, value in totals.items():
+            merged[field] += value
+
+    session = partial['session']
+    if session is not None and session['updated_at'] >= recent_after:
+        summary['sessions'][session['id']] = session
+
+def backfill(projects_dir=PROJECTS_DIR, workers=None):
+    """Scan all transcripts in parallel; returns (summary, tailer file states)"""
+    paths = [path for path, st in find_transcripts(projects_dir)]
+
+    summary = {
+        'generated_at': time.time(),
+        'files': 0,
+        'bytes': 0,
+        'totals': empty_totals(),
+        'projects': {},
+        'days': {},
+        'sessions': {}
+    }
+    states = {}
+    recent_after = summary['generated_at'] - RECENT_SECONDS
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for partial in pool.map(scan_file, paths, chunksize=16):
+            if partial is None:
+                continue
+            merge(summary, partial, recent_after)
+            states[partial['path']] = partial['state']
+
+    return summary, states
+
+def load_summary(summary_file=SUMMARY_FILE):
+    """Return the last backfill summary, or None if there is none"""
+    try:
+        with open(summary_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def make_corpus(corpus_dir, size_gb, file_mb=64):
+    """Write a synthetic transcript corpus for benchmarking (reused if present)"""
+    corpus_dir = Path(corpus_dir)
+    target = int(size_gb * (1 << 30))
+    existing = sum(p.stat().st_size for p in corpus_dir.glob('*/*.jsonl'))
+    if existing >= target:
+        return
+
+    # Mostly bulky tool output, with an assistant usage line every few entries
+    block = []
+    for i in range(200):
+        block.append(json.dumps({
+            'type': 'user',
+            'message': {'content': [{'type': 'tool_result', 'content': 'x' * 2000}]}
+        }))
+        block.append(json.dumps({
+            'type': 'assistant',
+            'sessionId': 'bench',
+            'timestamp': '2026-01-01T00:00:00Z',
+            'message': {'id': f'msg_{i}', 'usage': {
+                'input_tokens': 100 + i,
+                'output_tokens': 50,
+                'cache_read_input_tokens': 20000,
+                'cache_creation_input_tokens': 500
+            }}
+        }))
+    block = ('\n'.join(block) + '\n').encode()
+    repeats = max(1, (file_mb << 20) // len(block))
+
+    n = 0
+    while existing < target:
+        project = corpus_dir / f"project_{n % 50:02d}"
+        project.mkdir(parents=True, exist_ok=True)
+        path = project / f"session_{n:05d}.jsonl"
+        if not path.exists():
+            with open(path, 'wb') as f:
+                for _ in range(repeats):
+                    f.write(block)
+            existing += path.stat().st_size
+        n += 1
+
+def benchmark(corpus_dir, size_gb, workers=None):
+    print(f"Preparing {size_gb} GB synthetic corpus in {corpus_dir}...")
+    make_corpus(corpus_dir, size_gb)
+
+    start = time.perf_counter()
+    summary, states = backfill(corpus_dir, workers)
+    elapsed = time.perf_counter() - start
+
+    mb = summary['bytes'] / (1 << 20)
+    print(f"Files:      {summary['files']:,}")
+    print(f"Data:       {mb:,.0f} MB")
+    print(f"Messages:   {summary['totals']['messages']:,}")
+    print(f"Elapsed:    {elapsed:.2f} s")
+    print(f"Throughput: {summary['files'] / elapsed:,.1f} files/s, {mb / elapsed:,.1f} MB/s")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Backfill historical transcript usage for the Token HUD"
+    )
+    parser.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--bench', metavar='CORPUS_DIR',
+                        help="benchmark against a synthetic corpus in this directory")
+    parser.add_argument('--size-gb', type=float, default=10,
+                        help="synthetic corpus size for --bench (default: 10)")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.bench, args.size_gb, args.workers)
+        return
+
+    start = time.perf_counter()
+    summary, states = backfill(workers=args.workers)
+    write_status_file(summary, SUMMARY_FILE)
+
+    # Let the tailer resume where the backfill stopped instead of rescanning
+    if not STATE_FILE.exists():
+        write_status_file({'files': states}, STATE_FILE)
+
+    elapsed = time.perf_counter() - start
+    print(f"Scanned {summary['files']:,} transcripts ({summary['bytes'] / (1 << 20):,.1f} MB) "
+          f"in {elapsed:.2f} s")
+    print(f"Total: {summary['totals']['messages']:,} messages, "
+          f"{summary['totals']['output_tokens']:,} output tokens")
+    print(f"Summary written to {SUMMARY_FILE}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Single-canvas render backend for the Token HUD
+Draws whole HUD panels on one tk.Canvas with persistent item IDs, so an
+update only changes text, colors and coordinates in place, and several
+panels can share one window
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tkinter as tk
+
+from hud_render import DiffRenderer, band_color
+from sparkline import Sparkline
+
+PANEL_WIDTH = 300
+PANEL_HEIGHT = 170
+
+BG = '#1e1e1e'
+FG = '#ffffff'
+DIM = '#808080'
+TROUGH = '#2d2d2d'
+
+class CanvasText:
+    """Label-like handle on one canvas text item"""
+
+    # Label options and the canvas item options they correspond to
+    OPTIONS = {'text': 'text', 'fg': 'fill'}
+
+    def __init__(self, canvas, x, y, text='', anchor=tk.NW, font=('Segoe UI', 8), fill=DIM,
+                 justify=tk.LEFT):
+        self.canvas = canvas
+        self.item = canvas.create_text(
+            x, y, text=text, anchor=anchor, font=font, fill=fill, justify=justify
+        )
+
+    def config(self, **options):
+        self.canvas.itemconfig(self.item, **{self.OPTIONS[k]: v for k, v in options.items()})
+
+class CanvasBar:
+    """Progressbar-like trough and fill rectangles
+
+    Setting 'value' moves the fill's right edge; 'background' recolors it.
+    """
+
+    def __init__(self, canvas, x, y, width=270, height=12, color='#4ec9b0'):
+        self.canvas = canvas
+        self.x, self.y = x, y
+        self.width, self.height = width, height
+        self.trough = canvas.create_rectangle(x, y, x + width, y + height, fill=TROUGH, outline='')
+        self.fill = canvas.create_rectangle(x, y, x, y + height, fill=color, outline='')
+
+    def __setitem__(self, option, value):
+        if option != 'value':
+            raise KeyError(option)
+        right = self.x + self.width * min(max(value, 0), 100) / 100
+        self.canvas.coords(self.fill, self.x, self.y, right, self.y + self.height)
+
+    def config(self, background):
+        self.canvas.itemconfig(self.fill, fill=background)
+
+class CanvasPanel:
+    """One HUD panel drawn at (x, y) on a shared canvas
+
+    The attribute names match TokenHUD's widgets, so DiffRenderer and the
+    forecast and sparkline code drive either backend the same way.
+    """
+
+    def __init__(self, canvas, x=0, y=0, tag='panel', on_close=None):
+        self.canvas = canvas
+        self.tag = tag
+        self.band = None
+
+        canvas.create_rectangle(x, y, x + PANEL_WIDTH, y + PANEL_HEIGHT, fill=BG, outline='')
+        CanvasText(canvas, x + 15, y + 10, "Claude Code Tokens",
+                   font=('Segoe UI', 10, 'bold'), fill=FG)
+        close = CanvasText(canvas, x + PANEL_WIDTH - 15, y + 5, "×", anchor=tk.NE,
+                           font=('Segoe UI', 12, 'bold'), fill=FG)
+        if on_close is not None:
+            canvas.tag_bind(close.item, '<Button-1>', lambda event: on_close())
+        canvas.create_line(x + 15, y + 34, x + PANEL_WIDTH - 15, y + 34, fill='#3e3e3e')
+
+        self.remaining_label = CanvasText(canvas, x + 175, y + 40, "0", anchor=tk.NE,
+                                          font=('Segoe UI', 24, 'bold'), fill='#4ec9b0')
+        self.forecast_label = CanvasText(canvas, x + 183, y + 46, "")
+        self.subtitle_label = CanvasText(canvas, x + PANEL_WIDTH / 2, y + 82, "tokens remaining",
+                                         anchor=tk.N, font=('Segoe UI', 9))
+        self.progress = CanvasBar(canvas, x + 15, y + 104)
+        self.stats_label = CanvasText(canvas, x + PANEL_WIDTH / 2, y + 120, "", anchor=tk.N)
+        self.sparkline = Sparkline(None, canvas=canvas, x=x + 15, y=y + 140,
+                                   tag=f"{tag}-segment")
+
+    def render(self, render, data):
+        """Paint a status through a DiffRenderer"""
+        percentage = data['percentage']
+        render.config(self.remaining_label, text=f"{data['remaining']:,}")
+        render.config(self.stats_label,
+                      text=f"{data['used']:,} / {data['total']:,} ({percentage:.1f}%)")
+        render.set(self.progress, 'value', round(percentage, 1))
+
+        color = band_color(percentage)
+        if color != self.band:
+            self.band = color
+            render.config(self.remaining_label, fg=color)
+            render.count(self.sparkline.set_color(color))
+            render.config(self.progress, background=color)
+
+class CanvasBoard:
+    """One Canvas holding any number of panels in a grid"""
+
+    def __init__(self, parent, columns=1):
+        self.columns = columns
+        self.panels = []
+        self.canvas = tk.Canvas(parent, width=PANEL_WIDTH, height=PANEL_HEIGHT,
+                                bg=BG, bd=0, highlightthickness=0)
+
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+
+    def add_panel(self, on_close=None):
+        row, column = divmod(len(self.panels), self.columns)
+        panel = CanvasPanel(self.canvas, column * PANEL_WIDTH, row * PANEL_HEIGHT,
+                            tag=f"panel{len(self.panels)}", on_close=on_close)
+        self.panels.append(panel)
+
+        rows = row + 1
+        columns = min(len(self.panels), self.columns)
+        self.canvas.config(width=columns * PANEL_WIDTH, height=rows * PANEL_HEIGHT)
+        return panel
+
+def rss_kb():
+    """Current resident set size of this process in KiB"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+def bench_backend(backend, redraws, panels):
+    """Run in a child process: redraw one HUD as fast as possible"""
+    from token_hud import TokenHUD
+    from update_tokens import build_status
+
+    rss_before = rss_kb()
+    hud = TokenHUD(canvas=backend == 'canvas')
+    extra = []
+    if backend == 'canvas':
+        extra = [(hud.board.add_panel(), DiffRenderer()) for _ in range(panels - 1)]
+    hud.root.update()
+    rss_built = rss_kb()
+
+    start = time.perf_counter()
+    for i in range(redraws):
+        # Every redraw changes the numbers and, now and then, the color band
+        used = (i * 7919) % 200000
+        hud.token_data.update(build_status(used, 200000, time.time()))
+        hud.update_display()
+        hud.record_sample()
+        for panel, render in extra:
+            panel.render(render, hud.token_data)
+            panel.sparkline.push(used, 200000)
+        hud.root.update()
+    elapsed = time.perf_counter() - start
+
+    hud.reader.stop()
+    print(json.dumps({
+        'backend': backend,
+        'panels': 1 + len(extra),
+        'redraws_per_sec': redraws / elapsed,
+        'rss_build_kb': rss_built - rss_before,
+        'rss_kb': rss_kb()
+    }))
+
+def benchmark(redraws, panels):
+    """Compare the widget tree and the canvas backend, each in a fresh process"""
+    results = []
+    with tempfile.TemporaryDirectory() as home:
+        # A private HOME keeps the benchmark HUDs off the real status files and socket
+        env = dict(os.environ, HOME=home)
+        runs = [('widgets', 1), ('canvas', 1)]
+        if panels > 1:
+            runs.append(('canvas', panels))
+        for backend, count in runs:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--bench-backend', backend,
+                 '--redraws', str(redraws), '--panels', str(count)],
+                env=env, capture_output=True, text=True
+            )
+            if output.returncode != 0:
+                print(f"Error running {backend} benchmark: {output.stderr.strip()}")
+                continue
+            results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    print(f"{'Backend':<10} {'Panels':>6} {'Redraws/s':>10} {'Widgets RSS':>12} {'Total RSS':>10}")
+    for result in results:
+        print(f"{result['backend']:<10} {result['panels']:>6} {result['redraws_per_sec']:>10,.0f} "
+              f"{result['rss_build_kb']:>9,} KiB {result['rss_kb']:>6,} KiB")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the single-canvas HUD backend against the widget tree"
+    )
+    parser.add_argument('--redraws', type=int, default=2000, help="redraws per run (default: 2000)")
+    parser.add_argument('--panels', type=int, default=4,
+                        help="also time this many canvas panels in one window (default: 4)")
+    parser.add_argument('--bench-backend', choices=('widgets', 'canvas'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.bench_backend:
+        bench_backend(args.bench_backend, args.redraws, args.panels)
+    else:
+        benchmark(args.redraws, args.panels)
+
+if __name__ == '__main__':
+    main()
@@ -4,8 +4,12 @@ Create Konsole profiles with embedded wallpapers
 Each profile gets its own color scheme with the wallpaper built in
 """
 
+import argparse
 from pathlib import Path
 
+from forest_manifest import MANIFEST_FILE, load_images_info
+from wallpaper_variants import FORMATS, parse_size, variant_path
+
 def create_profile_with_wallpaper(profile_info):
     """Create a complete Konsole profile with embedded wallpaper"""
     konsole_dir = Path.home() / ".local" / "share" / "konsole"
@@ -245,20 +249,42 @@ BlinkingCursorEnabled=true
     }
 
 def main():
-    # Profile definitions
+    parser = argparse.ArgumentParser(description="Create Konsole forest profiles with wallpapers")
+    parser.add_argument('--variant', metavar='WIDTHxHEIGHT',
+                        help="use the wallpaper_variants.py variant of this size instead of the original")
+    parser.add_argument('--format', choices=FORMATS, default='jpeg',
+                        help="variant format (default: jpeg)")
+    args = parser.parse_args()
+    if args.variant:
+        # Variants are named by the normalized size, e.g. 1920X1080 -> 1920x1080
+        try:
+            args.variant = "{}x{}".format(*parse_size(args.variant))
+        except ValueError as e:
+            parser.error(str(e))
+
+    # Profile definitions, one per image in the generation manifest
     profiles = [
-        {'profile_name': 'Forest_MistyMorning', 'image': str(Path.home() / 'Pictures/konsole_forests/01_misty_morning.png'), 'color_type': 'light'},
-        {'profile_name': 'Forest_DarkEvergreen', 'image': str(Path.home() / 'Pictures/konsole_forests/02_dark_evergreen.png'), 'color_type': 'bright'},
-        {'profile_name': 'Forest_AutumnGlow', 'image': str(Path.home() / 'Pictures/konsole_forests/03_autumn_glow.png'), 'color_type': 'dark'},
-        {'profile_name': 'Forest_BambooZen', 'image': str(Path.home() / 'Pictures/konsole_forests/04_bamboo_zen.png'), 'color_type': 'medium'},
-        {'profile_name': 'Forest_SnowyPines', 'image': str(Path.home() / 'Pictures/konsole_forests/05_snowy_pines.png'), 'color_type': 'dark'},
-        {'profile_name': 'Forest_TropicalRainforest', 'image': str(Path.home() / 'Pictures/konsole_forests/06_tropical_rainforest.png'), 'color_type': 'bright'},
-        {'profile_name': 'Forest_SunsetCanopy', 'image': str(Path.home() / 'Pictures/konsole_forests/07_sunset_canopy.png'), 'color_type': 'bright'},
-        {'profile_name': 'Forest_MossyGrove', 'image': str(Path.home() / 'Pictures/konsole_forests/08_mossy_grove.png'), 'color_type': 'light'},
-        {'profile_name': 'Forest_BirchMinimal', 'image': str(Path.home() / 'Pictures/konsole_forests/09_birch_minimal.png'), 'color_type': 'dark'},
-        {'profile_name': 'Forest_NightForest', 'image': str(Path.home() / 'Pictures/konsole_forests/10_night_forest.png'), 'color_type': 'bright'},
+        {
+            'profile_name': f"Forest_{img['name'].title().replace('_', '')}",
+            'image': img['path'],
+            'color_type': img['colors']
+        }
+        for img in load_images_info()
     ]
 
+    if args.variant:
+        for profile in profiles:
+            path = variant_path(profile['image'], args.variant, args.format)
+            if path.exists():
+                profile['image'] = str(path)
+            else:
+                print(f"Warning: no {args.variant} {args.format} variant of "
+                      f"{Path(profile['image']).name}, using the original")
+    if not profiles:
+        print(f"Error: No forest images recorded in {MANIFEST_FILE}.")
+        print("Run generate_forest_collection.py first (--resume records images already on disk).")
+        return
+
     print("=" * 70)
     print("Creating Complete Konsole Forest Profiles with Wallpapers")
     print("=" * 70)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Burn-rate and time-to-exhaustion forecasting for the Token HUD
+Combines an EWMA of the instantaneous rate with a windowed linear
+regression, both updated in O(1) per sample
+"""
+
+import argparse
+import csv
+import math
+import random
+import sys
+import time
+from collections import deque
+
+# Time constant of the EWMA, in seconds
+EWMA_TAU = 120.0
+
+# Regression window; samples older than this fall out of the fit
+WINDOW_SECONDS = 600.0
+WINDOW_MAX_POINTS = 512
+
+class BurnRateEstimator:
+    """Tokens-per-second estimate from a stream of (timestamp, used) samples
+
+    The regression keeps running sums over a sliding window (times are
+    relative to the first sample to avoid cancellation), so adding a sample
+    and evicting old ones are both constant time. A drop in usage, such as
+    a new session or a compacted context, resets the estimate.
+    """
+
+    def __init__(self, tau=EWMA_TAU, window=WINDOW_SECONDS, max_points=WINDOW_MAX_POINTS):
+        self.tau = tau
+        self.window = window
+        self.max_points = max_points
+        self.reset()
+
+    def reset(self):
+        self.origin = None
+        self.last_t = None
+        self.last_used = None
+        self.ewma = None
+        self.samples = deque()
+        self.sum_t = self.sum_y = self.sum_tt = self.sum_ty = 0.0
+        self.evictions = 0
+
+    def update(self, timestamp, used):
+        if self.last_used is not None and used < self.last_used:
+            self.reset()
+
+        if self.origin is None:
+            self.origin = timestamp
+        t = timestamp - self.origin
+
+        if self.last_t is not None:
+            dt = t - self.last_t
+            if dt <= 0:
+                # Same instant: keep the newest value, no rate information
+                self.last_used = used
+                return
+            rate = (used - self.last_used) / dt
+            if self.ewma is None:
+                self.ewma = rate
+            else:
+                alpha = 1 - math.exp(-dt / self.tau)
+                self.ewma += alpha * (rate - self.ewma)
+
+        self.last_t = t
+        self.last_used = used
+        self._add(t, used)
+
+        while self.samples and (
+            t - self.samples[0][0] > self.window or len(self.samples) > self.max_points
+        ):
+            self._remove(*self.samples[0])
+
+    def _add(self, t, y):
+        self.samples.append((t, y))
+        self.sum_t += t
+        self.sum_y += y
+        self.sum_tt += t * t
+        self.sum_ty += t * y
+
+    def _remove(self, t, y):
+        self.samples.popleft()
+        self.sum_t -= t
+        self.sum_y -= y
+        self.sum_tt -= t * t
+        self.sum_ty -= t * y
+
+        # Occasionally rebuild the sums so rounding error cannot accumulate
+        # over weeks of sliding; amortised this is still O(1) per sample
+        self.evictions += 1
+        if self.evictions >= 4 * self.max_points:
+            self.evictions = 0
+            self.sum_t = sum(t for t, y in self.samples)
+            self.sum_y = sum(y for t, y in self.samples)
+            self.sum_tt = sum(t * t for t, y in self.samples)
+            self.sum_ty = sum(t * y for t, y in self.samples)
+
+    def slope(self):
+        """Least-squares tokens/second over the window, or None"""
+        n = len(self.samples)
+        if n < 3:
+            return None
+        denominator = n * self.sum_tt - self.sum_t * self.sum_t
+        if denominator <= 0:
+            return None
+        return (n * self.sum_ty - self.sum_t * self.sum_y) / denominator
+
+    def rate(self):
+        """Blended tokens/second, or None before there is enough data"""
+        slope = self.slope()
+        if slope is None:
+            return self.ewma
+        if self.ewma is None:
+            return slope
+        return (slope + self.ewma) / 2
+
+    def rate_per_minute(self):
+        rate = self.rate()
+        return None if rate is None else rate * 60
+
+    def eta_seconds(self, remaining):
+        """Seconds until remaining hits zero at the current pace, or None"""
+        rate = self.rate()
+        if rate is None or rate <= 0:
+            return None
+        return remaining / rate
+
+def format_rate(per_minute):
+    if per_minute is None:
+        return "– /min"
+    per_minute = max(per_minute, 0)
+    if per_minute >= 1000:
+        return f"{per_minute / 1000:.1f}k/min"
+    return f"{per_minute:.0f}/min"
+
+def format_eta(seconds):
+    if seconds is None:
+        return "ETA –"
+    if seconds < 60:
+        return f"ETA {seconds:.0f}s"
+    if seconds < 3600:
+        return f"ETA {seconds / 60:.0f}m"
+    hours, rest = divmod(int(seconds), 3600)
+    return f"ETA {hours}h{rest // 60:02d}m"
+
+def replay(samples, estimator=None):
+    """Feed (timestamp, used, total) samples through an estimator
+
+    Returns one (timestamp, tokens/min, eta seconds) tuple per sample, so a
+    recorded stream always reproduces the same forecasts.
+    """
+    estimator = estimator or BurnRateEstimator()
+    results = []
+    for timestamp, used, total in samples:
+        estimator.update(timestamp, used)
+        results.append((
+            timestamp,
+            estimator.rate_per_minute(),
+            estimator.eta_seconds(total - used)
+        ))
+    return results
+
+def read_samples(path):
+    """Read timestamp,used,total rows from a CSV file ('-' for stdin)"""
+    f = sys.stdin if path == '-' else open(path, newline='')
+    with f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith('#'):
+                continue
+            try:
+                yield float(row[0]), int(row[1]), int(row[2])
+            except (ValueError, IndexError):
+                continue
+
+def synthetic_samples(per_minute, count, interval=5.0, jitter=0.3, seed=1):
+    """Constant-rate stream with noisy arrival times and update sizes
+
+    The budget is sized so the stream never runs out before the last sample.
+    """
+    rng = random.Random(seed)
+    total = int(per_minute / 60 * interval * count * 2) + 1
+    t = 0.0
+    used = 0
+    for _ in range(count):
+        dt = interval * (1 + rng.uniform(-jitter, jitter))
+        t += dt
+        used = min(total, used + int(per_minute / 60 * dt * (1 + rng.uniform(-jitter, jitter))))
+        yield t, used, total
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay usage samples through the burn-rate estimator")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--replay', metavar='CSV',
+                        help="timestamp,used,total rows ('-' for stdin)")
+    source.add_argument('--synthetic', type=float, metavar='TOKENS_PER_MIN',
+                        help="generate a noisy constant-rate stream and check convergence")
+    parser.add_argument('--count', type=int, default=500, help="synthetic sample count")
+    parser.add_argument('--quiet', action='store_true', help="only print the summary")
+    args = parser.parse_args()
+
+    if args.replay:
+        samples = list(read_samples(args.replay))
+    else:
+        samples = list(synthetic_samples(args.synthetic, args.count))
+
+    start = time.perf_counter()
+    results = replay(samples)
+    elapsed = time.perf_counter() - start
+
+    if not args.quiet:
+        for timestamp, per_minute, eta in results:
+            print(f"{timestamp:14.3f}  {format_rate(per_minute):>10}  {format_eta(eta)}")
+
+    print(f"Samples: {len(results):,}  ({elapsed / max(len(results), 1) * 1e6:.2f} µs/update)")
+    if args.synthetic and results and results[-1][1] is not None:
+        error = abs(results[-1][1] - args.synthetic) / args.synthetic * 100
+        print(f"Final estimate: {format_rate(results[-1][1])} vs true "
+              f"{format_rate(args.synthetic)} ({error:.1f}% error)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Run manifest for the forest wallpaper collection
+generate_forest_collection.py records every theme's status, file, size,
+SHA-256 and color type here as it goes, so a failed run can be resumed
+and the Konsole profile scripts know which images exist without a
+hardcoded list
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+IMAGES_DIR = Path.home() / "Pictures" / "konsole_forests"
+MANIFEST_FILE = IMAGES_DIR / "manifest.json"
+
+MANIFEST_VERSION = 1
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def load_manifest(path=MANIFEST_FILE):
+    """Return the manifest dict, or None if there is none"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Error reading manifest {path}: {e}")
+        return None
+
+def load_images_info(path=MANIFEST_FILE):
+    """Completed images as the profile scripts expect them: path, name, colors, number"""
+    manifest = load_manifest(path)
+    if manifest is None:
+        return []
+    return [
+        {key: image[key] for key in ('path', 'name', 'colors', 'number')}
+        for image in manifest['images']
+        if image['status'] == 'done' and Path(image['path']).exists()
+    ]
+
+class RunManifest:
+    """The manifest of the current run, rewritten atomically after every change
+
+    Entries are keyed by theme number and move from 'pending' to 'done' or
+    'failed'. Worker threads call record(); each call leaves a complete,
+    valid file on disk, so a crash loses at most the image in flight.
+    """
+
+    def __init__(self, path=MANIFEST_FILE):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.data = None
+
+    def start(self, entries, resume=False, **run):
+        """Begin a run over entries (dicts with number, name, colors, key, path)
+
+        With resume, entries finished by an earlier run are kept if their
+        request key is unchanged and the file still matches its hash; files
+        from runs before the manifest existed are adopted. Returns the set
+        of numbers that need no work.
+        """
+        previous = {}
+        if resume:
+            manifest = load_manifest(self.path) or {'images': []}
+            previous = {image['name']: image for image in manifest['images']}
+
+        images = []
+        done = set()
+        for entry in entries:
+            image = dict(entry, status='pending')
+            old = previous.get(entry['name'])
+            if resume and self.still_valid(old, entry):
+                image.update(old, number=entry['number'])
+                done.add(entry['number'])
+            elif resume and old is None and Path(entry['path']).exists():
+                path = Path(entry['path'])
+                image.update(status='done', bytes=path.stat().st_size, sha256=file_sha256(path))
+                done.add(entry['number'])
+            images.append(image)
+
+        now = time.time()
+        self.data = dict(run, version=MANIFEST_VERSION, started=now, updated=now,
+                         resumed=resume, images=images)
+        with self.lock:
+            self.save()
+        return done
+
+    def still_valid(self, old, entry):
+        if old is None or old['status'] != 'done' or old.get('key') != entry['key']:
+            return False
+        path = Path(old['path'])
+        try:
+            return path.stat().st_size == old['bytes'] and file_sha256(path) == old['sha256']
+        except OSError:
+            return False
+
+    def record(self, number, **fields):
+        """Update one theme's entry (status, bytes, sha256, error, ...) and save"""
+        with self.lock:
+            for image in self.data['images']:
+                if image['number'] == number:
+                    image.update(fields)
+                    if fields.get('status') == 'done':
+                        image.pop('error', None)
+            self.data['updated'] = time.time()
+            self.save()
+
+    def counts(self):
+        with self.lock:
+            statuses = [image['status'] for image in self.data['images']]
+        return {status: statuses.count(status) for status in ('done', 'failed', 'pending')}
+
+    def save(self):
+        """Write to a temp file, fsync and rename; callers hold self.lock"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(dir=self.path.parent, prefix='.manifest.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.path)
+        except BaseException:
+            os.unlink(tmp_file)
+            raise
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Show the last collection run and the profile-to-image mapping"
+    )
+    parser.add_argument('--manifest', default=str(MANIFEST_FILE), help=f"default: {MANIFEST_FILE}")
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.manifest)
+    if manifest is None:
+        print(f"No manifest at {args.manifest}; run generate_forest_collection.py first.")
+        return
+    for image in manifest['images']:
+        profile = f"Forest_{image['name'].title().replace('_', '')}"
+        detail = image['path'] if image['status'] == 'done' else image.get('error', '')
+        print(f"{profile:<25} {image['status']:<8} -> {detail}")
+
+if __name__ == '__main__':
+    main()
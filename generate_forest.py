@@ -3,13 +3,16 @@
 Generate a high-quality forest image using DALL-E 3
 """
 
+import argparse
 import os
 from openai import OpenAI
 from datetime import datetime
 from pathlib import Path
-import httpx
 
-def generate_forest_image():
+from image_download import Downloader
+from wallpaper_cache import WallpaperCache, cache_key
+
+def generate_forest_image(force=False):
     # Setup
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
@@ -28,30 +31,42 @@ def generate_forest_image():
     Rich depth of field with incredible detail in the bark textures and foliage.
     Cinematic composition, nature photography, 8K quality, professional landscape photography."""
 
+    model = "dall-e-3"
+    size = "1792x1024"  # High quality landscape format
+    quality = "hd"  # HD quality
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"forest_{timestamp}.png"
+    filepath = output_dir / filename
+
+    # Same cache as generate_forest_collection.py: an unchanged prompt costs nothing
+    cache = WallpaperCache()
+    key = cache_key(model, prompt, size, quality)
+    if not force and cache.get(key, filepath) is not None:
+        print(f"✓ Cached image copied to: {filepath} (use --force to regenerate)")
+        return str(filepath)
+
     print(f"Generating forest image with DALL-E 3...")
     print(f"Prompt: {prompt[:100]}...")
 
     # Generate image
     response = client.images.generate(
-        model="dall-e-3",
+        model=model,
         prompt=prompt,
-        size="1792x1024",  # High quality landscape format
-        quality="hd",       # HD quality
+        size=size,
+        quality=quality,
         n=1
     )
 
     # Download and save
     image_url = response.data[0].url
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"forest_{timestamp}.png"
-    filepath = output_dir / filename
 
     print(f"Downloading image from: {image_url}")
 
-    # Download the image
-    img_response = httpx.get(image_url)
-    with open(filepath, 'wb') as f:
-        f.write(img_response.content)
+    # Stream the image to disk; it is only renamed into place once complete
+    with Downloader() as downloader:
+        sha256 = downloader.download(image_url, filepath)
+    cache.put(key, filepath, sha256, model=model, prompt=prompt, size=size, quality=quality)
 
     print(f"✓ Image saved to: {filepath}")
     print(f"✓ Size: {filepath.stat().st_size / 1024 / 1024:.2f} MB")
@@ -59,7 +74,12 @@ def generate_forest_image():
     return str(filepath)
 
 if __name__ == "__main__":
-    result = generate_forest_image()
+    parser = argparse.ArgumentParser(description="Generate a forest image with DALL-E 3")
+    parser.add_argument('--force', action='store_true',
+                        help="generate a new image even if this prompt is cached")
+    args = parser.parse_args()
+
+    result = generate_forest_image(args.force)
     if result:
         print(f"\nSuccess! Your forest image is ready at:\n{result}")
     else:
@@ -2,138 +2,494 @@
 """
 Generate 10 high-res forest images with different themes
 Each optimized for terminal backgrounds
+
+Requests run concurrently under a token-bucket limiter set in requests per
+minute; 429 responses slow the bucket down and are retried with jitter.
+--mock-test runs the same code against a local fake images endpoint.
 """
 
+import argparse
+import json
 import os
-from openai import OpenAI
+import random
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from openai import OpenAI, RateLimitError
 from datetime import datetime
 from pathlib import Path
-import httpx
 import time
 
-def generate_forest_images():
-    # Setup
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
-        print("Error: OPENAI_API_KEY not found in environment")
-        return []
+from forest_manifest import IMAGES_DIR, RunManifest
+from image_download import Downloader
+from wallpaper_cache import WallpaperCache, cache_key
+from wallpaper_variants import build_variants, print_summary
+
+OUTPUT_DIR = IMAGES_DIR
+
+# Image request parameters
+MODEL = "dall-e-3"
+SIZE = "1792x1024"  # HD landscape format
+QUALITY = "hd"
+
+# Requests per minute and requests in flight; set --rpm to the account's
+# images-per-minute limit
+DEFAULT_RPM = 5
+DEFAULT_CONCURRENCY = 4
+
+# Retries of one image after 429s; without a Retry-After the delay is
+# full-jitter exponential backoff
+MAX_RETRIES = 6
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 60.0
+
+# On a 429 the rate halves, never below this fraction of --rpm; each
+# success gives back this fraction
+MIN_RATE_FRACTION = 0.1
+RECOVERY_FRACTION = 0.1
+
+# 10 different forest themes optimized for terminal backgrounds
+FOREST_THEMES = [
+    {
+        "name": "misty_morning",
+        "prompt": "Ancient misty forest at dawn, soft blue-gray fog rolling through massive redwood trees, ethereal atmosphere, muted tones perfect for terminal background, peaceful and minimal, professional nature photography",
+        "colors": "light"  # Will use light text colors
+    },
+    {
+        "name": "dark_evergreen",
+        "prompt": "Deep dark pine forest at twilight, almost black tree silhouettes, very dark atmospheric background perfect for bright terminal text, moody and dramatic, minimal light sources, cinematic photography",
+        "colors": "bright"  # Will use bright text colors
+    },
+    {
+        "name": "autumn_glow",
+        "prompt": "Autumn forest with golden and amber leaves, warm orange and brown tones, soft diffused lighting, perfect depth for terminal text overlay, fall foliage, professional landscape photography",
+        "colors": "dark"  # Will use dark text colors for contrast
+    },
+    {
+        "name": "bamboo_zen",
+        "prompt": "Serene bamboo forest with straight vertical stalks, filtered green light, minimalist composition ideal for terminal background, zen aesthetic, shallow depth of field, nature photography",
+        "colors": "medium"  # Balanced colors
+    },
+    {
+        "name": "snowy_pines",
+        "prompt": "Snow-covered pine forest in winter, white and blue tones, frosted trees, clean minimal aesthetic perfect for terminal display, crisp and bright, professional winter photography",
+        "colors": "dark"  # Dark text on light background
+    },
+    {
+        "name": "tropical_rainforest",
+        "prompt": "Lush tropical rainforest with vibrant green foliage, palm fronds and ferns, dappled sunlight, rich colors but balanced for text readability, exotic flora, nature photography",
+        "colors": "bright"  # Bright text
+    },
+    {
+        "name": "sunset_canopy",
+        "prompt": "Forest canopy at sunset, warm golden hour light filtering through leaves, orange and purple sky visible through branches, perfect depth for terminal overlay, dramatic lighting, landscape photography",
+        "colors": "bright"  # Bright contrasting text
+    },
+    {
+        "name": "mossy_grove",
+        "prompt": "Ancient moss-covered oak forest, deep green tones, twisted branches, mystical atmosphere, perfect texture for terminal background without being too busy, soft natural lighting, fantasy-like photography",
+        "colors": "light"  # Light text colors
+    },
+    {
+        "name": "birch_minimal",
+        "prompt": "Minimalist birch forest with white bark trees, soft gray-blue background, very clean composition ideal for terminal text display, Nordic aesthetic, professional minimalist photography",
+        "colors": "dark"  # Dark text for contrast
+    },
+    {
+        "name": "night_forest",
+        "prompt": "Dark forest at night with subtle moonlight, very dark background perfect for bright terminal text, mysterious atmosphere, deep shadows, only hints of tree silhouettes, cinematic night photography",
+        "colors": "bright"  # Brightest text colors
+    }
+]
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at rate_per_minute
+
+    Adapts like TCP congestion control: backoff() halves the rate and,
+    given a Retry-After, blocks everyone until it passes; success() adds
+    the rate back in small steps up to the configured ceiling. 429s that
+    arrive together from requests already in flight count as one decrease.
+    """
+
+    def __init__(self, rate_per_minute, burst=1):
+        self.ceiling = rate_per_minute
+        self.rate = rate_per_minute
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.backoffs = 0
+        self.last_backoff = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now >= self.updated:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate / 60)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) * 60 / self.rate
+                else:
+                    # Blocked by a Retry-After
+                    wait = self.updated - now
+            time.sleep(wait)
+
+    def backoff(self, retry_after=None):
+        with self.lock:
+            self.backoffs += 1
+            now = time.monotonic()
+            if now - self.last_backoff >= 60 / self.rate:
+                self.rate = max(self.ceiling * MIN_RATE_FRACTION, self.rate / 2)
+                self.last_backoff = now
+            # Drain the bucket from now, so refilling starts over at the lower rate
+            self.tokens = 0
+            self.updated = max(self.updated, now + (retry_after or 0))
 
-    client = OpenAI(api_key=api_key)
-    output_dir = Path.home() / "Pictures" / "konsole_forests"
+    def success(self):
+        with self.lock:
+            self.rate = min(self.ceiling, self.rate + self.ceiling * RECOVERY_FRACTION)
+
+def retry_after_seconds(error):
+    """Retry-After of a 429 in seconds, or None"""
+    headers = error.response.headers
+    try:
+        if 'retry-after-ms' in headers:
+            return float(headers['retry-after-ms']) / 1000
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+def image_path(output_dir, number, theme):
+    return Path(output_dir) / f"{number:02d}_{theme['name']}.png"
+
+def generate_image(client, theme, number, total, output_dir, limiter, downloader,
+                   cache=None, force=False, manifest=None):
+    """Generate and download one theme, or copy it from the cache; returns its image info, or None"""
+    label = f"[{number}/{total}] {theme['name']}"
+    filepath = image_path(output_dir, number, theme)
+    info = {
+        'path': str(filepath),
+        'name': theme['name'],
+        'colors': theme['colors'],
+        'number': number
+    }
+
+    key = cache_key(MODEL, theme['prompt'], SIZE, QUALITY)
+    if cache is not None and not force:
+        entry = cache.get(key, filepath)
+        if entry is not None:
+            print(f"{label}: ✓ Cached {filepath.name}")
+            if manifest is not None:
+                manifest.record(number, status='done', bytes=entry['bytes'], sha256=entry['sha256'])
+            return dict(info, sha256=entry['sha256'])
+
+    print(f"{label}: {theme['prompt'][:60]}...")
+    try:
+        for attempt in range(MAX_RETRIES + 1):
+            limiter.acquire()
+            try:
+                response = client.images.generate(
+                    model=MODEL,
+                    prompt=theme['prompt'],
+                    size=SIZE,
+                    quality=QUALITY,
+                    n=1
+                )
+                break
+            except RateLimitError as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                # The limiter holds every worker for Retry-After; jitter spreads
+                # the retries out so they do not all land at the same instant
+                retry_after = retry_after_seconds(e)
+                limiter.backoff(retry_after)
+                delay = random.uniform(0, retry_after or min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+                print(f"{label}: rate limited, retrying in {delay:.1f}s")
+                time.sleep(delay)
+        limiter.success()
+
+        # Download and save
+        image_url = response.data[0].url
+        sha256 = downloader.download(image_url, filepath)
+
+        size = filepath.stat().st_size
+        print(f"{label}: ✓ Saved {filepath.name} ({size / 1024 / 1024:.2f} MB)")
+        if manifest is not None:
+            manifest.record(number, status='done', bytes=size, sha256=sha256)
+
+        if cache is not None:
+            try:
+                cache.put(key, filepath, sha256, model=MODEL, prompt=theme['prompt'],
+                          size=SIZE, quality=QUALITY)
+            except OSError as e:
+                print(f"{label}: Error caching image: {e}")
+
+        return dict(info, sha256=sha256)
+
+    except Exception as e:
+        print(f"{label}: ✗ Error: {e}")
+        if manifest is not None:
+            manifest.record(number, status='failed', error=str(e))
+        return None
+
+def generate_forest_images(themes=FOREST_THEMES, concurrency=DEFAULT_CONCURRENCY, rpm=DEFAULT_RPM,
+                           output_dir=OUTPUT_DIR, base_url=None, api_key=None, limiter=None,
+                           cache=None, force=False, manifest=None, resume=False):
+    """Generate every theme, up to concurrency at a time; returns the saved images in order
+
+    With a WallpaperCache, themes whose request was generated before are
+    copied from it; force=True regenerates them anyway (and re-caches).
+    A RunManifest records each theme's outcome; with resume=True, themes
+    it already has as done are skipped.
+    """
+    output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # 10 different forest themes optimized for terminal backgrounds
-    forest_prompts = [
-        {
-            "name": "misty_morning",
-            "prompt": "Ancient misty forest at dawn, soft blue-gray fog rolling through massive redwood trees, ethereal atmosphere, muted tones perfect for terminal background, peaceful and minimal, professional nature photography",
-            "colors": "light"  # Will use light text colors
-        },
-        {
-            "name": "dark_evergreen",
-            "prompt": "Deep dark pine forest at twilight, almost black tree silhouettes, very dark atmospheric background perfect for bright terminal text, moody and dramatic, minimal light sources, cinematic photography",
-            "colors": "bright"  # Will use bright text colors
-        },
-        {
-            "name": "autumn_glow",
-            "prompt": "Autumn forest with golden and amber leaves, warm orange and brown tones, soft diffused lighting, perfect depth for terminal text overlay, fall foliage, professional landscape photography",
-            "colors": "dark"  # Will use dark text colors for contrast
-        },
+    entries = [
         {
-            "name": "bamboo_zen",
-            "prompt": "Serene bamboo forest with straight vertical stalks, filtered green light, minimalist composition ideal for terminal background, zen aesthetic, shallow depth of field, nature photography",
-            "colors": "medium"  # Balanced colors
-        },
-        {
-            "name": "snowy_pines",
-            "prompt": "Snow-covered pine forest in winter, white and blue tones, frosted trees, clean minimal aesthetic perfect for terminal display, crisp and bright, professional winter photography",
-            "colors": "dark"  # Dark text on light background
-        },
-        {
-            "name": "tropical_rainforest",
-            "prompt": "Lush tropical rainforest with vibrant green foliage, palm fronds and ferns, dappled sunlight, rich colors but balanced for text readability, exotic flora, nature photography",
-            "colors": "bright"  # Bright text
-        },
-        {
-            "name": "sunset_canopy",
-            "prompt": "Forest canopy at sunset, warm golden hour light filtering through leaves, orange and purple sky visible through branches, perfect depth for terminal overlay, dramatic lighting, landscape photography",
-            "colors": "bright"  # Bright contrasting text
-        },
-        {
-            "name": "mossy_grove",
-            "prompt": "Ancient moss-covered oak forest, deep green tones, twisted branches, mystical atmosphere, perfect texture for terminal background without being too busy, soft natural lighting, fantasy-like photography",
-            "colors": "light"  # Light text colors
-        },
-        {
-            "name": "birch_minimal",
-            "prompt": "Minimalist birch forest with white bark trees, soft gray-blue background, very clean composition ideal for terminal text display, Nordic aesthetic, professional minimalist photography",
-            "colors": "dark"  # Dark text for contrast
-        },
-        {
-            "name": "night_forest",
-            "prompt": "Dark forest at night with subtle moonlight, very dark background perfect for bright terminal text, mysterious atmosphere, deep shadows, only hints of tree silhouettes, cinematic night photography",
-            "colors": "bright"  # Brightest text colors
+            'number': i,
+            'name': theme['name'],
+            'colors': theme['colors'],
+            'key': cache_key(MODEL, theme['prompt'], SIZE, QUALITY),
+            'path': str(image_path(output_dir, i, theme))
         }
+        for i, theme in enumerate(themes, 1)
     ]
-
+    done = set()
     generated_images = []
+    if manifest is not None:
+        done = manifest.start(entries, resume, model=MODEL, size=SIZE, quality=QUALITY)
+        generated_images = [
+            {key: image[key] for key in ('path', 'name', 'colors', 'number', 'sha256')}
+            for image in manifest.data['images'] if image['number'] in done
+        ]
+    todo = [(i, theme) for i, theme in enumerate(themes, 1) if i not in done]
+    if done:
+        print(f"Resuming: {len(done)} of {len(themes)} images already complete")
+    if not todo:
+        return generated_images
 
-    for i, theme in enumerate(forest_prompts, 1):
-        print(f"\n[{i}/10] Generating: {theme['name']}")
-        print(f"Theme: {theme['prompt'][:80]}...")
+    # Setup
+    api_key = api_key or os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        print("Error: OPENAI_API_KEY not found in environment")
+        return generated_images
 
-        try:
-            # Generate image
-            response = client.images.generate(
-                model="dall-e-3",
-                prompt=theme['prompt'],
-                size="1792x1024",  # HD landscape format
-                quality="hd",
-                n=1
-            )
+    # Our limiter does the retrying, so the SDK must not retry 429s itself
+    client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+    limiter = limiter or TokenBucket(rpm)
 
-            # Download and save
-            image_url = response.data[0].url
-            filename = f"{i:02d}_{theme['name']}.png"
-            filepath = output_dir / filename
+    with Downloader(max_connections=concurrency) as downloader, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(generate_image, client, theme, i, len(themes), output_dir, limiter,
+                        downloader, cache, force, manifest)
+            for i, theme in todo
+        ]
+        for future in as_completed(futures):
+            image = future.result()
+            if image is not None:
+                generated_images.append(image)
 
-            print(f"  Downloading...")
-            img_response = httpx.get(image_url)
+    return sorted(generated_images, key=lambda image: image['number'])
 
-            with open(filepath, 'wb') as f:
-                f.write(img_response.content)
+class MockImagesHandler(BaseHTTPRequestHandler):
+    """Fake images API: rate limited generations and fixed-size image downloads"""
 
-            size_mb = filepath.stat().st_size / 1024 / 1024
-            print(f"  ✓ Saved: {filepath.name} ({size_mb:.2f} MB)")
+    # Keep-alive, so the pooled image downloads reuse their connections
+    protocol_version = 'HTTP/1.1'
 
-            generated_images.append({
-                'path': str(filepath),
-                'name': theme['name'],
-                'colors': theme['colors'],
-                'number': i
-            })
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        wait = server.take_token()
+        if wait:
+            server.count('rate_limited')
+            self.send_json(429, {'error': {'message': "Rate limit reached", 'type': 'requests'}},
+                           {'retry-after-ms': str(int(wait * 1000) + 1)})
+            return
 
-            # Rate limiting - wait between requests
-            if i < len(forest_prompts):
-                print("  Waiting 3 seconds...")
-                time.sleep(3)
+        time.sleep(server.latency)
+        if server.count('requests') <= server.failures:
+            self.send_json(500, {'error': {'message': "Mock server error", 'type': 'server_error'}})
+            return
+        number = server.count('generated')
+        host, port = server.server_address
+        self.send_json(200, {
+            'created': int(time.time()),
+            'data': [{'url': f"http://{host}:{port}/images/{number}.png"}]
+        })
 
-        except Exception as e:
-            print(f"  ✗ Error: {e}")
-            continue
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(self.server.image)))
+        self.end_headers()
+        self.wfile.write(self.server.image)
 
-    return generated_images
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+class MockImagesServer(ThreadingHTTPServer):
+    """Local stand-in for the images endpoint, allowing server_rpm generations per minute
+
+    The first `failures` admitted generations fail with a 500, which the
+    generator does not retry, so they are left for --resume.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, server_rpm, latency=0.2, image_size=512 * 1024, failures=0):
+        super().__init__(('127.0.0.1', 0), MockImagesHandler)
+        self.server_rpm = server_rpm
+        self.latency = latency
+        self.image = b'\x89PNG\r\n\x1a\n' + os.urandom(image_size - 8)
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.failures = failures
+        self.counts = {'requests': 0, 'generated': 0, 'rate_limited': 0}
+        self.lock = threading.Lock()
+
+    def take_token(self):
+        """0 if the request may proceed, else seconds until it could"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(1.0, self.tokens + (now - self.updated) * self.server_rpm / 60)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) * 60 / self.server_rpm
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+            return self.counts[name]
+
+def run_mock_test(images=30, concurrency=DEFAULT_CONCURRENCY, rpm=DEFAULT_RPM, server_rpm=None):
+    """Generate against a local mock endpoint and report throughput and wall time
+
+    The server fails a tenth of the first pass; a --resume pass must
+    request exactly those images again, and a fresh run after that must be
+    served from the (private) cache without a single request.
+    """
+    failures = max(1, images // 10)
+    server = MockImagesServer(server_rpm or rpm, failures=failures)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    themes = []
+    for i in range(images):
+        # Unique prompts, so the first pass cannot hit the cache
+        theme = FOREST_THEMES[i % len(FOREST_THEMES)]
+        themes.append(dict(theme, name=f"mock_{i + 1:03d}", prompt=f"{theme['prompt']} (mock {i + 1})"))
+    limiter = TokenBucket(rpm)
+
+    def run(**kwargs):
+        requests = server.counts['requests']
+        start = time.perf_counter()
+        generated = generate_forest_images(
+            themes, concurrency, rpm, output_dir, base_url=f"http://{host}:{port}/v1",
+            api_key="mock", cache=cache, manifest=manifest, **kwargs
+        )
+        return generated, time.perf_counter() - start, server.counts['requests'] - requests
+
+    try:
+        with tempfile.TemporaryDirectory() as output_dir, tempfile.TemporaryDirectory() as cache_dir:
+            cache = WallpaperCache(cache_dir)
+            manifest = RunManifest(Path(output_dir) / 'manifest.json')
+            generated, elapsed, _ = run(limiter=limiter)
+            first_counts = manifest.counts()
+            resumed, resumed_elapsed, resumed_requests = run(resume=True)
+            cached, cached_elapsed, cached_requests = run()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print("\n" + "=" * 70)
+    print(f"Mock test: {len(generated)}/{images} images, concurrency {concurrency}, "
+          f"--rpm {rpm}, server limit {server.server_rpm}/min")
+    print(f"  Wall time:   {elapsed:.2f} s")
+    print(f"  Throughput:  {len(generated) / elapsed * 60:.1f} images/min")
+    print(f"  429s served: {server.counts['rate_limited']} "
+          f"(limiter backed off {limiter.backoffs} times, ended at {limiter.rate:.0f}/min)")
+    print(f"  Manifest:    {first_counts['done']} done, {first_counts['failed']} failed "
+          f"({failures} server errors injected)")
+    print(f"  --resume:    {len(resumed)}/{images} images in {resumed_elapsed:.2f} s, "
+          f"{resumed_requests} requests")
+    print(f"  Cached rerun: {len(cached)}/{images} images in {cached_elapsed:.2f} s, "
+          f"{cached_requests} requests")
+    return (first_counts['failed'] == failures and len(resumed) == images
+            and resumed_requests == failures and len(cached) == images and cached_requests == 0)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate forest wallpapers for Konsole with DALL-E 3"
+    )
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"requests in flight (default: {DEFAULT_CONCURRENCY}; 1 = one at a time)")
+    parser.add_argument('--rpm', type=float, default=DEFAULT_RPM,
+                        help=f"requests per minute (default: {DEFAULT_RPM})")
+    parser.add_argument('--force', action='store_true',
+                        help="regenerate images even if the cache has them")
+    parser.add_argument('--link-cache', action='store_true',
+                        help="hard-link images to and from the cache instead of copying them")
+    parser.add_argument('--resume', action='store_true',
+                        help="only generate the images the last run's manifest lacks")
+    parser.add_argument('--variants', action='store_true',
+                        help="then render per-monitor variants (see wallpaper_variants.py; needs Pillow)")
+    parser.add_argument('--mock-test', type=int, nargs='?', const=30, metavar='IMAGES',
+                        help="generate IMAGES (default: 30) from a local mock endpoint instead")
+    parser.add_argument('--server-rpm', type=float,
+                        help="rate limit of the mock endpoint (default: --rpm)")
+    args = parser.parse_args()
+    if args.concurrency < 1 or args.rpm <= 0:
+        parser.error("--concurrency and --rpm must be positive")
+
+    if args.mock_test:
+        ok = run_mock_test(args.mock_test, args.concurrency, args.rpm, args.server_rpm)
+        raise SystemExit(0 if ok else 1)
 
-if __name__ == "__main__":
     print("=" * 70)
     print("Generating 10 High-Res Forest Images for Konsole Backgrounds")
     print("=" * 70)
 
-    images = generate_forest_images()
+    manifest = RunManifest(OUTPUT_DIR / "manifest.json")
+    images = generate_forest_images(concurrency=args.concurrency, rpm=args.rpm,
+                                    cache=WallpaperCache(link=args.link_cache), force=args.force,
+                                    manifest=manifest, resume=args.resume)
 
     print("\n" + "=" * 70)
     print(f"Complete! Generated {len(images)} images")
     print("=" * 70)
 
+    failed = manifest.counts()['failed']
+    if failed:
+        print(f"  {failed} failed; rerun with --resume to generate only those")
+    print(f"  Manifest: {manifest.path}")
+
     for img in images:
         print(f"  {img['number']:2d}. {img['name']:20s} -> {img['path']}")
+
+    if args.variants and images:
+        print()
+        summary = build_variants(images)
+        if summary is not None:
+            print_summary(summary)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Background I/O for the Token HUD
+One thread owns every file, socket and shared-memory reader, parses what
+they deliver and hands finished snapshots to the Tk thread through a queue,
+so the UI never waits on a slow disk or an NFS home directory
+"""
+
+import cProfile
+import heapq
+import itertools
+import os
+import queue
+import select
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from backfill import load_summary
+from hud_metrics import registry as metrics
+from hud_socket import HUDSocketServer
+from sessions import SESSIONS_DIR, read_session_file, session_file
+from status_shm import StatusSegment
+from status_watcher import DirectoryWatcher, StatusWatcher
+from transcript_ingest import CONTEXT_LIMIT, TranscriptTailer, latest_by_session
+from update_tokens import STATUS_FILE, StatusJournal, append_log, build_status
+from usage_log import UsageLog
+
+# Stat polling interval used only when inotify is unavailable
+STAT_POLL_MS = 500
+
+# How often pushed updates are flushed to token_status.json for other readers
+SNAPSHOT_MS = 5000
+
+# How often the shared-memory sequence counter is checked in --shm mode
+SHM_POLL_MS = 100
+
+# How long to batch a burst of session writes before reading them
+SESSION_FLUSH_MS = 100
+
+# How often transcripts are checked for appended usage in --ingest mode
+INGEST_POLL_MS = 2000
+
+# How often old usage log segments are compacted
+COMPACT_MS = 3600 * 1000
+
+class StatusReader(threading.Thread):
+    """Read and parse every status source off the Tk thread
+
+    Finished results are put on self.queue as tuples:
+        ('initial', data)            status file contents at startup
+        ('status', data, session)    a new status (session None = unkeyed)
+        ('session', name, data)      a session file was written
+        ('session_removed', name)    a session file was deleted
+        ('history', records)         newest usage log records, oldest first
+        ('command', name, args)      forwarded by a second launch (see hud_socket)
+    Every message also makes notify_fd readable, so the Tk thread can wake
+    on data instead of polling. Pushed, shm and ingested updates are
+    written back to the status files from here, coalesced to one snapshot
+    per SNAPSHOT_MS.
+
+    Polled sources (shm, stat fallback, transcripts) are re-armed through
+    the RefreshScheduler, if given: their interval stretches while nothing
+    changes and they are parked entirely while the HUD is hidden.
+
+    With profile=True the thread runs under its own cProfile.Profile,
+    available as self.profiler once stop() has returned. On Python 3.12+
+    there is none: only one profiler can be active per process, and the
+    main thread's already covers every thread.
+    """
+
+    def __init__(self, status_file=STATUS_FILE, show_sessions=False, use_shm=False,
+                 ingest=False, history_points=0, scheduler=None, profile=False):
+        super().__init__(name='hud-io', daemon=True)
+        self.queue = queue.SimpleQueue()
+        self.scheduler = scheduler
+        self.notify_fd, self.notify_w = os.pipe()
+        os.set_blocking(self.notify_w, False)
+        self.status_file = Path(status_file)
+        self.show_sessions = show_sessions
+        self.use_shm = use_shm
+        self.ingest = ingest
+        self.history_points = history_points
+        self.profiler = cProfile.Profile() if profile and sys.version_info < (3, 12) else None
+
+        self.mode = 'starting'
+        self.stopping = False
+        self.wake_r, self.wake_w = os.pipe()
+
+        # fd -> callback, and a heap of (due, seq, callback) timers
+        self.handlers = {self.wake_r: self.on_wake}
+        self.timers = []
+        self.timer_seq = itertools.count()
+
+        # Polled sources waiting for the window to be shown again
+        self.parked = []
+        self.resume_requested = False
+
+        self.watcher = None
+        self.session_watcher = None
+        self.socket_server = None
+        self.segment = None
+        self.tailer = None
+        self.journal = None
+        self.dirty_snapshots = {}
+        self.snapshot_pending = False
+        self.pending_sessions = set()
+        self.removed_sessions = set()
+        self.session_flush_pending = False
+
+    def call_later(self, delay_ms, callback):
+        heapq.heappush(self.timers, (time.monotonic() + delay_ms / 1000, next(self.timer_seq), callback))
+
+    def call_polled(self, base_ms, callback):
+        """Re-arm a polled source, never sooner than base_ms"""
+        interval = base_ms if self.scheduler is None else self.scheduler.interval_ms()
+        if interval is None:
+            self.parked.append((base_ms, callback))
+            return
+        self.call_later(max(base_ms, interval), callback)
+
+    def resume(self):
+        """Re-arm parked sources; called from the Tk thread when the HUD is shown"""
+        self.resume_requested = True
+        os.write(self.wake_w, b'r')
+
+    def emit(self, message):
+        """Hand a finished message to the Tk thread and wake it"""
+        self.queue.put(message)
+        if self.scheduler is not None:
+            self.scheduler.changed()
+        try:
+            os.write(self.notify_w, b'.')
+        except BlockingIOError:
+            pass  # Pipe full: the Tk thread has plenty of wakeups pending
+
+    def drain_notify(self):
+        try:
+            os.read(self.notify_fd, 65536)
+        except BlockingIOError:
+            pass
+
+    def stop(self, timeout=2.0):
+        """Ask the thread to finish (flushing snapshots) and wait for it"""
+        self.stopping = True
+        if self.is_alive():
+            os.write(self.wake_w, b'x')
+            self.join(timeout)
+        if not self.is_alive():
+            for fd in (self.wake_r, self.wake_w, self.notify_fd, self.notify_w):
+                os.close(fd)
+
+    def run(self):
+        if self.profiler is not None:
+            self.profiler.enable()
+        try:
+            self.load_initial()
+            self.open_sources()
+            self.loop()
+        finally:
+            self.write_snapshot()
+            self.close_sources()
+            if self.profiler is not None:
+                self.profiler.disable()
+
+    def loop(self):
+        while not self.stopping:
+            timeout = None
+            if self.timers:
+                timeout = max(0.0, self.timers[0][0] - time.monotonic())
+            readable, _, _ = select.select(list(self.handlers), [], [], timeout)
+            if self.scheduler is not None:
+                self.scheduler.wakeup('reader events' if readable else 'reader timers')
+
+            for fd in readable:
+                self.dispatch(self.handlers.get(fd))
+
+            now = time.monotonic()
+            while self.timers and self.timers[0][0] <= now:
+                self.dispatch(heapq.heappop(self.timers)[2])
+
+    def dispatch(self, callback):
+        # One failing source must not take the others down with the thread
+        if callback is None:
+            return
+        try:
+            callback()
+        except Exception as e:
+            print(f"Error in HUD reader: {e}")
+
+    def on_wake(self):
+        os.read(self.wake_r, 64)
+        if self.resume_requested:
+            self.resume_requested = False
+            parked, self.parked = self.parked, []
+            for base_ms, callback in parked:
+                self.call_polled(base_ms, callback)
+
+    def load_initial(self):
+        """Queue what the HUD shows before the first live update"""
+        if self.history_points and not self.show_sessions:
+            try:
+                self.emit(('history', UsageLog().tail(self.history_points)))
+            except (OSError, ValueError) as e:
+                print(f"Error reading usage log: {e}")
+
+        data = self.load_token_data()
+        if data is not None:
+            self.emit(('initial', data))
+
+        if self.ingest:
+            self.load_backfill_summary()
+
+    def open_sources(self):
+        self.status_file.parent.mkdir(parents=True, exist_ok=True)
+        self.watcher = StatusWatcher(self.status_file)
+        self.mode = self.watcher.mode
+        if self.watcher.fileno() is not None:
+            self.handlers[self.watcher.fileno()] = self.on_status_event
+        else:
+            self.call_polled(STAT_POLL_MS, self.poll_status_file)
+
+        if self.show_sessions:
+            self.session_watcher = DirectoryWatcher(SESSIONS_DIR)
+            self.queue_session_changes(*self.session_watcher.scan())
+            if self.session_watcher.fileno() is not None:
+                self.handlers[self.session_watcher.fileno()] = self.on_sessions_event
+            else:
+                self.call_polled(STAT_POLL_MS, self.poll_sessions_dir)
+
+        try:
+            self.socket_server = HUDSocketServer()
+            self.handlers[self.socket_server.fileno()] = self.on_socket_accept
+        except OSError as e:
+            print(f"Push channel unavailable, using status file only: {e}")
+
+        if self.use_shm:
+            try:
+                self.segment = StatusSegment(create=True)
+                self.segment_seq = self.segment.sequence()
+                self.call_polled(SHM_POLL_MS, self.poll_segment)
+            except OSError as e:
+                print(f"Shared-memory segment unavailable: {e}")
+
+        if self.ingest:
+            self.tailer = TranscriptTailer()
+            self.poll_transcripts()
+
+        self.call_polled(COMPACT_MS, self.compact_log)
+
+    def close_sources(self):
+        if self.tailer is not None:
+            self.tailer.flush()
+        if self.socket_server is not None:
+            self.socket_server.close()
+        if self.segment is not None:
+            self.segment.close()
+        if self.session_watcher is not None:
+            self.session_watcher.close()
+        if self.watcher is not None:
+            self.watcher.close()
+        if self.journal is not None:
+            self.journal.close()
+
+    def load_token_data(self):
+        """Load token data from status file; returns None if unavailable"""
+        start = time.perf_counter()
+        try:
+            if not self.status_file.exists():
+                return None
+            data = read_session_file(self.status_file)
+        except OSError as e:
+            print(f"Error loading token data: {e}")
+            data = None
+
+        metrics.inc('tokenhud_reads_total', source='status')
+        if data is None:
+            metrics.inc('tokenhud_errors_total', source='status')
+        else:
+            metrics.since('tokenhud_parse_seconds', start, source='status')
+        return data
+
+    def on_status_event(self):
+        if self.watcher.check():
+            self.refresh()
+        else:
+            metrics.inc('tokenhud_reads_skipped_total', source='status')
+
+    def poll_status_file(self):
+        """Fallback: stat() the file and only re-read it when it changed"""
+        if self.watcher.check():
+            self.refresh()
+        else:
+            metrics.inc('tokenhud_reads_skipped_total', source='status')
+        self.call_polled(STAT_POLL_MS, self.poll_status_file)
+
+    def refresh(self):
+        # Our own snapshot writes come back through the watcher unchanged;
+        # the UI drops them by comparing updated_at
+        data = self.load_token_data()
+        if data is not None:
+            self.emit(('status', data, None))
+
+    def on_sessions_event(self):
+        self.queue_session_changes(*self.session_watcher.check())
+
+    def poll_sessions_dir(self):
+        self.queue_session_changes(*self.session_watcher.check())
+        self.call_polled(STAT_POLL_MS, self.poll_sessions_dir)
+
+    def queue_session_changes(self, changed, removed):
+        """Batch a burst of session writes into one read pass"""
+        self.pending_sessions |= changed
+        self.pending_sessions -= removed
+        self.removed_sessions |= removed
+
+        if (self.pending_sessions or self.removed_sessions) and not self.session_flush_pending:
+            self.session_flush_pending = True
+            self.call_later(SESSION_FLUSH_MS, self.flush_sessions)
+
+    def flush_sessions(self):
+        self.session_flush_pending = False
+        for name in self.removed_sessions:
+            self.emit(('session_removed', Path(name).stem))
+        for name in self.pending_sessions:
+            start = time.perf_counter()
+            data = read_session_file(SESSIONS_DIR / name)
+            metrics.inc('tokenhud_reads_total', source='session')
+            if data is None:
+                metrics.inc('tokenhud_errors_total', source='session')
+                continue
+            metrics.since('tokenhud_parse_seconds', start, source='session')
+            self.emit(('session', Path(name).stem, data))
+        self.pending_sessions.clear()
+        self.removed_sessions.clear()
+
+    def on_socket_accept(self):
+        conn = self.socket_server.accept()
+        if conn is not None:
+            self.handlers[conn.fileno()] = lambda conn=conn: self.on_socket_data(conn)
+
+    def on_socket_data(self, conn):
+        fd = conn.fileno()
+        updates = self.socket_server.read(conn)
+        if updates is None:
+            del self.handlers[fd]
+            return
+
+        # Commands from a second launch go to the Tk thread in order
+        for update in updates:
+            if 'command' in update:
+                self.emit(('command', update['command'], update['args']))
+
+        # Only the newest update per session in a burst needs painting
+        pushed = [update for update in updates if 'command' not in update]
+        latest = {update['session']: update for update in pushed}
+        metrics.inc('tokenhud_reads_total', len(pushed), source='socket')
+        if len(pushed) > len(latest):
+            metrics.inc('tokenhud_reads_skipped_total', len(pushed) - len(latest), source='socket')
+        for session, update in latest.items():
+            data = build_status(update['used'], update['total'], update['updated_at'])
+            self.emit(('status', data, session))
+            self.schedule_snapshot(session, data)
+
+    def poll_segment(self):
+        # Reading the 8-byte sequence counter is the only per-tick cost
+        seq = self.segment.sequence()
+        snapshot = self.segment.read_status() if seq != self.segment_seq else None
+        if snapshot is not None:
+            self.segment_seq, data = snapshot
+            metrics.inc('tokenhud_reads_total', source='shm')
+            self.emit(('status', data, None))
+            self.schedule_snapshot(None, data)
+        elif seq != self.segment_seq:
+            # Torn or in-progress write: keep segment_seq and retry next tick
+            metrics.inc('tokenhud_errors_total', source='shm')
+        else:
+            metrics.inc('tokenhud_reads_skipped_total', source='shm')
+        self.call_polled(SHM_POLL_MS, self.poll_segment)
+
+    def load_backfill_summary(self):
+        """Show recently active sessions from backfill.py without reading history"""
+        summary = load_summary()
+        if summary is None:
+            return
+
+        recent = sorted(summary['sessions'].items(), key=lambda item: item[1]['updated_at'])
+        if not self.show_sessions:
+            recent = [(None, session) for _, session in recent[-1:]]
+
+        for session_id, session in recent:
+            data = build_status(session['context'], CONTEXT_LIMIT, session['updated_at'])
+            self.emit(('status', data, session_id))
+
+    def poll_transcripts(self):
+        """Apply usage appended to Claude Code transcripts since the last poll"""
+        latest = latest_by_session(self.tailer.poll())
+
+        # Without a session list only the most recently active session is shown
+        if not self.show_sessions and latest:
+            latest = dict([list(latest.items())[-1]])
+
+        for session, record in latest.items():
+            data = build_status(record['context'], CONTEXT_LIMIT)
+            shown = session if self.show_sessions else None
+            self.emit(('status', data, shown))
+            self.schedule_snapshot(shown, data)
+            # Logged under the transcript's session, which the analytics import
+            # skips because it counts those sessions per message
+            append_log(data, session)
+        self.call_polled(INGEST_POLL_MS, self.poll_transcripts)
+
+    def compact_log(self):
+        try:
+            UsageLog().compact()
+        except (OSError, ValueError) as e:
+            print(f"Error compacting usage log: {e}")
+        self.call_polled(COMPACT_MS, self.compact_log)
+
+    def schedule_snapshot(self, session, data):
+        self.dirty_snapshots[session] = data
+        if not self.snapshot_pending:
+            self.snapshot_pending = True
+            self.call_later(SNAPSHOT_MS, self.write_snapshot)
+
+    def write_snapshot(self):
+        """Flush coalesced pushed updates to the status files
+
+        They go through the writers' journal, like every other update: a
+        '--add' merged since the push is newer and wins, and pushes that
+        writers journaled but never merged are folded in here.
+        """
+        if not self.snapshot_pending:
+            return
+        self.snapshot_pending = False
+
+        dirty, self.dirty_snapshots = self.dirty_snapshots, {}
+        try:
+            if self.journal is None:
+                self.journal = StatusJournal(status_file=self.status_file)
+            for session, data in dirty.items():
+                self.journal.append(data, session)
+            self.journal.merge()
+        except OSError as e:
+            print(f"Error writing status snapshot: {e}")
+            metrics.inc('tokenhud_errors_total', source='snapshot')
+
+class FrameTimer:
+    """Durations of Tk-thread callbacks, to show none of them blocks"""
+
+    def __init__(self, budget_ms=1.0, window=4096):
+        self.budget_ms = budget_ms
+        self.samples = deque(maxlen=window)
+        self.frames = 0
+        self.over_budget = 0
+        self.worst_ms = 0.0
+
+    def record(self, start):
+        """Record a frame that began at perf_counter() value start"""
+        ms = (time.perf_counter() - start) * 1000
+        self.samples.append(ms)
+        self.frames += 1
+        self.worst_ms = max(self.worst_ms, ms)
+        if ms > self.budget_ms:
+            self.over_budget += 1
+
+    def summary(self):
+        if not self.samples:
+            return "no frames yet"
+        ordered = sorted(self.samples)
+        p50 = ordered[len(ordered) // 2]
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return (f"{self.frames:,} frames, p50 {p50:.3f} ms, p99 {p99:.3f} ms, "
+                f"max {self.worst_ms:.3f} ms, {self.over_budget} over {self.budget_ms:g} ms")
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Hot-path metrics for the Token HUD and its writers
+Histograms and counters kept in memory and exported in the Prometheus text
+format, either as a textfile for node_exporter's textfile collector or
+from a localhost-only HTTP endpoint
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+# One .prom file per process kind, ready for --collector.textfile.directory
+METRICS_DIR = Path.home() / '.claude' / 'metrics'
+
+# Port of the localhost endpoint started with --metrics-http
+METRICS_PORT = 9464
+
+# Minimum seconds between textfile rewrites
+TEXTFILE_INTERVAL = 15
+
+# Histogram bucket upper bounds in seconds
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# Every metric the HUD and writers record: name -> (type, help, buckets)
+METRICS = {
+    'tokenhud_parse_seconds': (
+        'histogram', "Time to read and parse a status or session file", FAST_BUCKETS),
+    'tokenhud_render_seconds': (
+        'histogram', "Time spent in update_display", FAST_BUCKETS),
+    'tokenhud_update_latency_seconds': (
+        'histogram', "Writer updated_at stamp to repaint", LATENCY_BUCKETS),
+    'tokenhud_write_seconds': (
+        'histogram', "Time to publish one update from a writer", FAST_BUCKETS),
+    'tokenhud_reads_total': (
+        'counter', "Status sources read", None),
+    'tokenhud_reads_skipped_total': (
+        'counter', "Reads avoided because nothing changed, or updates dropped as stale", None),
+    'tokenhud_errors_total': (
+        'counter', "Failed reads and writes", None),
+}
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects it"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    """Thread-safe store for the metrics in METRICS
+
+    Labels are keyword arguments, e.g. inc('tokenhud_errors_total',
+    source='status'). Recording costs one lock and a dict lookup.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.server = None
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(METRICS[name][2])
+            histogram.observe(seconds)
+
+    def since(self, name, start, **labels):
+        """Observe the seconds elapsed since a time.perf_counter() start"""
+        self.observe(name, time.perf_counter() - start, **labels)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self.lock:
+            histograms = {key: (list(h.counts), h.sum, h.count) for key, h in self.histograms.items()}
+            counters = dict(self.counters)
+
+        lines = []
+        for name, (kind, text, buckets) in METRICS.items():
+            if kind == 'histogram':
+                series = sorted((key, value) for key, value in histograms.items() if key[0] == name)
+            else:
+                series = sorted((key, value) for key, value in counters.items() if key[0] == name)
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (_, labels), value in series:
+                if kind == 'counter':
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {total!r}")
+                lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """Replace a .prom file atomically, so the collector never reads half of it"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_file.write_text(self.render())
+        tmp_file.replace(path)
+
+    def serve(self, port=METRICS_PORT):
+        """Serve /metrics on 127.0.0.1 from a daemon thread"""
+        # Imported here: update_tokens imports this module on every hook call
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood the console
+
+        self.server = HTTPServer(('127.0.0.1', port), Handler)
+        threading.Thread(target=self.server.serve_forever, name='hud-metrics', daemon=True).start()
+        return self.server
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+class TextfileExporter:
+    """Rewrite a .prom file at most every TEXTFILE_INTERVAL seconds"""
+
+    def __init__(self, registry, path, interval=TEXTFILE_INTERVAL):
+        self.registry = registry
+        self.path = Path(path)
+        self.interval = interval
+        self.last_write = 0.0
+
+    def maybe_write(self):
+        if time.monotonic() - self.last_write >= self.interval:
+            self.write()
+
+    def write(self):
+        try:
+            self.registry.write_textfile(self.path)
+        except OSError as e:
+            print(f"Error writing metrics to {self.path}: {e}")
+        self.last_write = time.monotonic()
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+# Shared by every module in the process
+registry = MetricsRegistry()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Diff-based rendering for the Token HUD
+Remembers what every widget option was last set to and only issues the Tk
+calls whose output would change, counting the ones it does make. Imports
+nothing, so terminal front ends can share the color bands
+"""
+
+# Hex colors of the remaining-percentage bands
+BAND_COLORS = {
+    'low': '#ff5555',  # Red
+    'warning': '#ffaa00',  # Orange
+    'ok': '#4ec9b0'  # Teal
+}
+
+def band(percentage):
+    """Band name for a remaining percentage"""
+    if percentage < 10:
+        return 'low'
+    elif percentage < 25:
+        return 'warning'
+    return 'ok'
+
+def band_color(percentage):
+    """Color for a remaining percentage"""
+    return BAND_COLORS[band(percentage)]
+
+class DiffRenderer:
+    """Cache of rendered widget options with a per-tick Tk call counter
+
+    An idle HUD should cost nothing: a tick in which no value changed makes
+    zero Tk calls, which the idle_ticks counter makes visible.
+    """
+
+    def __init__(self):
+        self.cache = {}
+        self.calls = 0
+        self.last_tick_calls = 0
+        self.total_calls = 0
+        self.ticks = 0
+        self.idle_ticks = 0
+
+    def config(self, widget, **options):
+        """widget.config() with only the options that changed; returns True if any did"""
+        changed = {
+            option: value for option, value in options.items()
+            if self.cache.get((widget, option), self) != value
+        }
+        if not changed:
+            return False
+        widget.config(**changed)
+        for option, value in changed.items():
+            self.cache[(widget, option)] = value
+        self.count()
+        return True
+
+    def set(self, widget, option, value):
+        """widget[option] = value unless it already is"""
+        if self.cache.get((widget, option), self) == value:
+            return False
+        widget[option] = value
+        self.cache[(widget, option)] = value
+        self.count()
+        return True
+
+    def style(self, style, name, **options):
+        """Configure a ttk style only when its options change
+
+        ttk recomputes the theme on every configure, so this is the call
+        most worth skipping.
+        """
+        changed = {
+            option: value for option, value in options.items()
+            if self.cache.get((name, option), self) != value
+        }
+        if not changed:
+            return False
+        style.configure(name, **changed)
+        for option, value in changed.items():
+            self.cache[(name, option)] = value
+        self.count()
+        return True
+
+    def forget(self, widget):
+        """Drop cached options, e.g. after a widget was recreated"""
+        for key in [key for key in self.cache if key[0] is widget]:
+            del self.cache[key]
+
+    def count(self, calls=1):
+        """Count Tk calls made outside config/set/style"""
+        self.calls += calls
+
+    def end_tick(self):
+        """Close one UI tick; returns the Tk calls it made"""
+        self.last_tick_calls = self.calls
+        self.total_calls += self.calls
+        self.ticks += 1
+        if not self.calls:
+            self.idle_ticks += 1
+        self.calls = 0
+        return self.last_tick_calls
+
+    def summary(self):
+        return (f"{self.total_calls:,} Tk calls over {self.ticks:,} ticks, "
+                f"{self.idle_ticks:,} ticks idle, last tick {self.last_tick_calls}")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Adaptive refresh scheduling for the Token HUD
+Picks how long the HUD may sleep between polls from how recently the data
+changed, how fast tokens are burning and whether the window is visible,
+and counts wakeups so the savings can be checked
+"""
+
+import threading
+import time
+from collections import Counter
+
+# Bounds of the refresh interval
+MIN_INTERVAL_MS = 100
+MAX_INTERVAL_MS = 30000
+
+# After a change the interval grows to this fraction of the quiet time,
+# e.g. 10 s after the last update the HUD polls once a second
+RECENCY_FRACTION = 0.1
+
+# Burn rates (tokens/min) above which the interval is capped
+BURN_RATE_CAPS = (
+    (10000, 250),
+    (1000, 1000),
+    (1, 5000)
+)
+
+# The estimator keeps its last rate when updates stop, so the caps only
+# apply while updates are still arriving
+BURN_RATE_HORIZON_MS = 120000
+
+class RefreshScheduler:
+    """Shared between the Tk thread and the reader thread
+
+    interval_ms() returns None while the window is hidden, meaning no
+    timer should be armed at all until set_visible(True).
+    """
+
+    def __init__(self, min_ms=MIN_INTERVAL_MS, max_ms=MAX_INTERVAL_MS):
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.last_change = time.monotonic()
+        self.rate_per_minute = None
+        self.visible = True
+        self.started = time.monotonic()
+        self.wakeups = Counter()
+        self.lock = threading.Lock()
+
+    def changed(self):
+        self.last_change = time.monotonic()
+
+    def set_rate(self, per_minute):
+        self.rate_per_minute = per_minute
+
+    def set_visible(self, visible):
+        self.visible = visible
+
+    def interval_ms(self):
+        if not self.visible:
+            return None
+
+        quiet_ms = (time.monotonic() - self.last_change) * 1000
+        interval = quiet_ms * RECENCY_FRACTION
+
+        rate = self.rate_per_minute or 0
+        if quiet_ms > BURN_RATE_HORIZON_MS:
+            rate = 0
+        for threshold, cap in BURN_RATE_CAPS:
+            if rate >= threshold:
+                interval = min(interval, cap)
+                break
+        return int(min(max(interval, self.min_ms), self.max_ms))
+
+    def wakeup(self, source):
+        with self.lock:
+            self.wakeups[source] += 1
+
+    def per_hour(self):
+        hours = max(time.monotonic() - self.started, 1.0) / 3600
+        with self.lock:
+            return {source: count / hours for source, count in self.wakeups.items()}
+
+    def summary(self):
+        rates = self.per_hour()
+        total = sum(rates.values())
+        parts = ', '.join(f"{source} {rate:,.0f}" for source, rate in sorted(rates.items()))
+        interval = self.interval_ms()
+        state = "hidden" if interval is None else f"interval {interval:,} ms"
+        return f"{total:,.0f} wakeups/hour ({parts or 'none'}); {state}"
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Unix domain socket push channel for the Token HUD
+Writers push compact one-line updates to a running HUD instead of
+rewriting token_status.json on every call. A second launch uses the same
+channel to forward commands (show, hide, move, ...) to the running HUD
+"""
+
+import fcntl
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+
+SOCKET_PATH = Path.home() / '.claude' / 'token_hud.sock'
+
+# Held by the running HUD for its whole lifetime
+LOCK_PATH = Path.home() / '.claude' / 'token_hud.lock'
+
+# Commands a later launch may forward, and how many arguments each takes
+COMMANDS = {
+    'show': 0,
+    'hide': 0,
+    'toggle': 0,
+    'move': 2,
+    'quit': 0
+}
+
+# How long a forwarder waits for a HUD that holds the lock but is still
+# starting up and has not bound its socket yet
+FORWARD_TIMEOUT = 2.0
+
+def format_update(used, total, updated_at=None, session=None):
+    """Encode an update as one line: 'U <used> <total> <updated_at> [session]'
+
+    session must already be whitespace-free (see sessions.safe_session_id).
+    """
+    if updated_at is None:
+        updated_at = time.time()
+    line = f"U {used} {total} {updated_at:.6f}"
+    if session is not None:
+        line += f" {session}"
+    return f"{line}\n".encode()
+
+def parse_update(line):
+    """Decode a line produced by format_update, or return None"""
+    fields = line.split()
+    if len(fields) not in (4, 5) or fields[0] != b'U':
+        return None
+    try:
+        return {
+            'used': int(fields[1]),
+            'total': int(fields[2]),
+            'updated_at': float(fields[3]),
+            'session': fields[4].decode() if len(fields) == 5 else None
+        }
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def format_command(command, *args):
+    """Encode a command as one line: 'C <command> [args...]'"""
+    return ' '.join(['C', command, *map(str, args)]).encode() + b'\n'
+
+def parse_command(line):
+    """Decode a line produced by format_command, or return None"""
+    fields = line.split()
+    if len(fields) < 2 or fields[0] != b'C':
+        return None
+    try:
+        command, args = fields[1].decode(), [field.decode() for field in fields[2:]]
+    except UnicodeDecodeError:
+        return None
+    if COMMANDS.get(command) != len(args):
+        return None
+    return {'command': command, 'args': args}
+
+def acquire_instance_lock(path=LOCK_PATH):
+    """Take the single-instance lock; returns the open lock file, or None if held
+
+    The lock lasts as long as the returned file stays open, and the kernel
+    drops it if the HUD dies, so there is no stale lock to clean up.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lock = open(path, 'a')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return None
+    return lock
+
+def instance_running(path=LOCK_PATH):
+    """True if a HUD currently holds the single-instance lock"""
+    lock = acquire_instance_lock(path)
+    if lock is None:
+        return True
+    lock.close()
+    return False
+
+def forward_command(command, *args, timeout=FORWARD_TIMEOUT):
+    """Send a command to the running HUD; returns False if none answered in time"""
+    client = HUDClient()
+    deadline = time.monotonic() + timeout
+    while not client.send_command(command, *args):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.02)
+    client.close()
+    return True
+
+def parse_commands(argv):
+    """Split launch arguments into commands and HUD flags
+
+    'move 10 20 hide --sessions' gives ([('move', ['10', '20']), ('hide', [])],
+    ['--sessions']). Raises ValueError on an unknown command or a missing argument.
+    """
+    commands, flags = [], []
+    argv = list(argv)
+    while argv:
+        arg = argv.pop(0)
+        if arg.startswith('-'):
+            flags.append(arg)
+            continue
+        if arg not in COMMANDS:
+            raise ValueError(f"unknown command {arg!r} (expected one of {', '.join(COMMANDS)})")
+        count = COMMANDS[arg]
+        if len(argv) < count:
+            raise ValueError(f"{arg} takes {count} arguments")
+        commands.append((arg, argv[:count]))
+        del argv[:count]
+    return commands, flags
+
+class HUDClient:
+    """Push updates to a running HUD over one reusable connection
+
+    send() returns False when no HUD is listening so callers can fall back
+    to writing the status file themselves.
+    """
+
+    def __init__(self, path=SOCKET_PATH):
+        self.path = str(path)
+        self.sock = None
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            return False
+        self.sock = sock
+        return True
+
+    def send(self, used, total, updated_at=None, session=None):
+        message = format_update(used, total, updated_at, session)
+
+        # One reconnect attempt covers a HUD that restarted since last send
+        for _ in range(2):
+            if self.sock is None and not self.connect():
+                return False
+            try:
+                self.sock.sendall(message)
+                return True
+            except OSError:
+                self.close()
+        return False
+
+    def send_command(self, command, *args):
+        """Forward a command (see COMMANDS) to the running HUD"""
+        if self.sock is None and not self.connect():
+            return False
+        try:
+            self.sock.sendall(format_command(command, *args))
+            return True
+        except OSError:
+            self.close()
+            return False
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+class HUDSocketServer:
+    """Non-blocking listening socket; the HUD drives it from its event loop"""
+
+    def __init__(self, path=SOCKET_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.buffers = {}
+
+        if self.path.exists():
+            if HUDClient(self.path).connect():
+                raise OSError(f"Another HUD is already listening on {self.path}")
+            self.path.unlink()
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(str(self.path))
+        os.chmod(self.path, 0o600)
+        self.sock.listen(16)
+        self.sock.setblocking(False)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def accept(self):
+        """Accept a pending writer and return its connection, or None"""
+        try:
+            conn, _ = self.sock.accept()
+        except BlockingIOError:
+            return None
+        conn.setblocking(False)
+        self.buffers[conn] = b''
+        return conn
+
+    def read(self, conn):
+        """Return complete updates and commands from a connection, or None once it closed"""
+        try:
+            chunk = conn.recv(65536)
+        except BlockingIOError:
+            return []
+        except OSError:
+            chunk = b''
+
+        if not chunk:
+            self.buffers.pop(conn, None)
+            conn.close()
+            return None
+
+        *lines, self.buffers[conn] = (self.buffers[conn] + chunk).split(b'\n')
+        updates = []
+        for line in lines:
+            update = parse_update(line) or parse_command(line)
+            if update is not None:
+                updates.append(update)
+        return updates
+
+    def close(self):
+        for conn in self.buffers:
+            conn.close()
+        self.buffers.clear()
+        self.sock.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+def main():
+    """Forward launch arguments to a running HUD: exit 0 if one took them, 1 if none runs
+
+    launch_hud.sh calls this before starting a new HUD, which keeps a
+    repeated launch to one short-lived process and no Tk import.
+    """
+    try:
+        commands, flags = parse_commands(sys.argv[1:])
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    if not instance_running():
+        sys.exit(1)
+    for command, args in commands or [('show', [])]:
+        if not forward_command(command, *args):
+            print("Error: a Token HUD holds the lock but is not answering", file=sys.stderr)
+            sys.exit(2)
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
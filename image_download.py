@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Shared image downloader for the wallpaper generators
+Streams each image over a pooled keep-alive connection into a partial file,
+hashing as it goes, resumes interrupted transfers of the same URL with
+validated Range requests and renames the file into place only once it is
+complete and verified
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+# Bytes read per chunk; also the most a download holds in memory
+CHUNK_SIZE = 256 * 1024
+
+# Connections kept open per Downloader
+MAX_CONNECTIONS = 8
+
+# Attempts per image: the first plus resumes after a dropped connection
+MAX_ATTEMPTS = 4
+
+TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+
+def partial_path(dest):
+    """Where an unfinished download of dest is kept"""
+    dest = Path(dest)
+    return dest.with_name(f".{dest.name}.part")
+
+def partial_info_path(dest):
+    """Sidecar recording the URL and validators the partial file came from"""
+    dest = Path(dest)
+    return dest.with_name(f".{dest.name}.part.json")
+
+def load_partial_info(dest):
+    try:
+        with open(partial_info_path(dest), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def discard_partial(dest):
+    partial_path(dest).unlink(missing_ok=True)
+    partial_info_path(dest).unlink(missing_ok=True)
+
+class Downloader:
+    """Pooled, resumable downloads; safe to share between threads
+
+    download() returns the file's SHA-256 hex digest. It raises ValueError
+    on a checksum mismatch and OSError (httpx errors included) once every
+    attempt failed, leaving the partial file for a later download of the
+    same URL to resume. A partial file from a different URL is discarded;
+    one from the same URL is resumed with If-Range on the server's ETag or
+    Last-Modified, so a changed file is fetched whole instead of spliced.
+    """
+
+    def __init__(self, max_connections=MAX_CONNECTIONS, timeout=TIMEOUT):
+        self.client = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+            follow_redirects=True
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.client.close()
+
+    def download(self, url, dest, sha256=None):
+        """Stream url to dest; sha256, if given, must match the finished file"""
+        dest = Path(dest)
+        part = partial_path(dest)
+        info = load_partial_info(dest)
+        if info is None or info.get('url') != url:
+            # E.g. a regenerated image saved under the same name
+            discard_partial(dest)
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                digest = self.fetch(url, dest)
+                break
+            except (httpx.TransportError, OSError) as e:
+                if attempt == MAX_ATTEMPTS:
+                    raise OSError(f"Download of {dest.name} failed after {attempt} attempts: {e}")
+                time.sleep(0.5 * attempt)
+
+        if sha256 is not None and digest != sha256:
+            discard_partial(dest)
+            raise ValueError(f"Checksum mismatch for {dest.name}: expected {sha256}, got {digest}")
+        os.replace(part, dest)
+        partial_info_path(dest).unlink(missing_ok=True)
+        return digest
+
+    def fetch(self, url, dest):
+        """Fill dest's partial file, resuming from its current length; returns the SHA-256"""
+        part = partial_path(dest)
+        offset = part.stat().st_size if part.exists() else 0
+        headers = {}
+        if offset:
+            headers['Range'] = f"bytes={offset}-"
+            info = load_partial_info(dest) or {}
+            validator = info.get('etag') or info.get('last_modified')
+            if validator:
+                # A changed file comes back whole (200) instead of as a range
+                headers['If-Range'] = validator
+
+        with self.client.stream('GET', url, headers=headers) as response:
+            status = response.status_code
+            content_range = response.headers.get('Content-Range', '')
+            if status == 416:
+                # The range starts at the end: done, if the file is that long
+                total = content_range.rpartition('/')[2]
+                if total != str(offset):
+                    discard_partial(dest)
+                    raise OSError(f"stale partial file ({offset:,} bytes, server has {total or 'unknown'})")
+            else:
+                response.raise_for_status()
+
+            if status == 206:
+                start = content_range.removeprefix('bytes ').split('-')[0]
+                if start != str(offset):
+                    discard_partial(dest)
+                    raise OSError(f"server resumed at byte {start or 'unknown'} instead of {offset:,}")
+            elif status == 200:
+                # Fresh start: the first attempt, a changed file, or Range ignored
+                offset = 0
+                etag = response.headers.get('ETag')
+                with open(partial_info_path(dest), 'w') as f:
+                    json.dump({
+                        'url': url,
+                        # Weak ETags are not allowed in If-Range
+                        'etag': None if etag is None or etag.startswith('W/') else etag,
+                        'last_modified': response.headers.get('Last-Modified')
+                    }, f)
+
+            # Blob stores send the whole file's MD5; check it when they do
+            content_md5 = (response.headers.get('x-ms-blob-content-md5')
+                           or (response.headers.get('Content-MD5')
+                               if response.status_code == 200 else None))
+            hashes = [hashlib.sha256()] + ([hashlib.md5()] if content_md5 else [])
+
+            # Re-hash what is already on disk so the digests cover the whole file
+            if offset:
+                with open(part, 'rb') as f:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                        for h in hashes:
+                            h.update(chunk)
+
+            # 416: the Range starts at the end, the previous attempt got everything
+            if response.status_code != 416:
+                expected = response.headers.get('Content-Length')
+                received = 0
+                with open(part, 'ab' if offset else 'wb') as f:
+                    for chunk in response.iter_bytes(CHUNK_SIZE):
+                        f.write(chunk)
+                        for h in hashes:
+                            h.update(chunk)
+                        received += len(chunk)
+                if expected is not None and received != int(expected):
+                    raise OSError(f"connection closed after {offset + received:,} bytes")
+
+            if content_md5 and base64.b64decode(content_md5) != hashes[1].digest():
+                discard_partial(dest)
+                raise ValueError(f"MD5 mismatch for {url}")
+        return hashes[0].hexdigest()
+
+class BenchHandler(BaseHTTPRequestHandler):
+    """Serves the benchmark file with Range and If-Range support, optionally dropping transfers"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        data = self.server.data
+        etag = f'"{self.server.sha256[:16]}"'
+        start = 0
+        if self.headers.get('Range') and self.headers.get('If-Range', etag) == etag:
+            start = int(self.headers['Range'].split('=')[1].split('-')[0])
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(data)}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+            self.send_header('Content-MD5', self.server.md5)
+        self.send_header('Content-Length', str(len(data) - start))
+        self.send_header('ETag', etag)
+        self.end_headers()
+
+        body = memoryview(data)[start:]
+        with self.server.lock:
+            drop = self.server.drops > 0
+            self.server.drops -= drop
+        if drop:
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class BenchServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, size_mb, drops=0):
+        super().__init__(('127.0.0.1', 0), BenchHandler)
+        self.data = os.urandom(size_mb * 1024 * 1024)
+        self.md5 = base64.b64encode(hashlib.md5(self.data).digest()).decode()
+        self.sha256 = hashlib.sha256(self.data).hexdigest()
+        self.drops = drops
+        self.lock = threading.Lock()
+
+def bench_client(mode, url, count, output_dir):
+    """Run in a child process so peak RSS belongs to one download mode"""
+    import resource
+
+    start = time.perf_counter()
+    total = 0
+    if mode == 'get':
+        # The generators' old path: a new connection and the whole body in memory
+        for i in range(count):
+            response = httpx.get(url, timeout=TIMEOUT)
+            path = Path(output_dir) / f"get_{i}.png"
+            with open(path, 'wb') as f:
+                f.write(response.content)
+            total += path.stat().st_size
+    else:
+        with Downloader() as downloader:
+            for i in range(count):
+                path = Path(output_dir) / f"stream_{i}.png"
+                downloader.download(url, path)
+                total += path.stat().st_size
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        'mode': mode,
+        'mb_per_sec': total / 1024 / 1024 / elapsed,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    }))
+
+def benchmark(size_mb=32, count=8):
+    """Compare whole-body httpx.get with pooled streaming, then check a resume"""
+    server = BenchServer(size_mb)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/image.png"
+
+    print(f"Downloading {count} x {size_mb} MB from a local server")
+    print(f"{'Mode':<8} {'MB/s':>8} {'Peak RSS':>12}")
+    with tempfile.TemporaryDirectory() as output_dir:
+        for mode in ('get', 'stream'):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--bench-client', mode, url,
+                 '--count', str(count), '--output', output_dir],
+                capture_output=True, text=True
+            )
+            if output.returncode != 0:
+                print(f"Error running {mode} benchmark: {output.stderr.strip()}")
+                continue
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            print(f"{mode:<8} {result['mb_per_sec']:>8,.0f} {result['peak_rss_kb'] / 1024:>9,.1f} MB")
+
+        # The server drops the first transfer halfway; the retry must resume
+        server.drops = 1
+        dest = Path(output_dir) / 'resumed.png'
+        with Downloader() as downloader:
+            digest = downloader.download(url, dest, sha256=server.sha256)
+        ok = digest == server.sha256 and dest.stat().st_size == len(server.data)
+        print(f"Resume after a dropped connection: {'PASS' if ok else 'FAIL'}")
+
+        # Partial files that must not be resumed: (description, part, sidecar)
+        size = len(server.data)
+        stale = [
+            ("another URL", os.urandom(size // 2), {'url': url + '?old'}),
+            ("a changed file", os.urandom(size // 2), {'url': url, 'etag': '"old"'}),
+            ("a longer file", os.urandom(size + 1), {'url': url}),
+            ("a file of the same length", os.urandom(size), {'url': url, 'etag': '"old"'}),
+        ]
+        for description, part, info in stale:
+            dest = Path(output_dir) / 'stale.png'
+            partial_path(dest).write_bytes(part)
+            partial_info_path(dest).write_text(json.dumps(info))
+            with Downloader() as downloader:
+                digest = downloader.download(url, dest)
+            passed = digest == server.sha256 and not partial_info_path(dest).exists()
+            print(f"Partial file from {description} discarded: {'PASS' if passed else 'FAIL'}")
+            ok = ok and passed
+
+    server.shutdown()
+    server.server_close()
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark streamed, pooled downloads against whole-body httpx.get"
+    )
+    parser.add_argument('--size-mb', type=int, default=32, help="size of the served file (default: 32)")
+    parser.add_argument('--count', type=int, default=8, help="downloads per mode (default: 8)")
+    parser.add_argument('--bench-client', nargs=2, metavar=('MODE', 'URL'), help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.bench_client:
+        bench_client(*args.bench_client, args.count, args.output)
+    else:
+        sys.exit(0 if benchmark(args.size_mb, args.count) else 1)
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,13 @@
 #!/bin/bash
 # Launch Token HUD Widget
+# A running HUD takes the arguments instead (show, hide, toggle, move X Y,
+# quit; default show), so repeated launches never start a second one
 
 cd "$(dirname "$0")"
-python3 token_hud.py &
+python3 hud_socket.py "$@"
+case $? in
+    0) exit 0 ;;  # Forwarded to the running HUD
+    1) ;;         # None running
+    *) exit 1 ;;
+esac
+python3 token_hud.py "$@" &
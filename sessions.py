@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Per-session token tracking for the Token HUD
+Each session reports to its own file under ~/.claude/token_sessions/ and the
+HUD keeps running totals so one update never rescans every session
+"""
+
+import bisect
+import json
+import re
+from pathlib import Path
+
+SESSIONS_DIR = Path.home() / '.claude' / 'token_sessions'
+
+# Row name used for unkeyed updates (token_status.json) in sessions mode
+DEFAULT_SESSION = 'default'
+
+def safe_session_id(session_id):
+    """Make a session ID usable as a file name and a socket message field"""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', session_id).lstrip('.') or '_'
+
+def session_file(session_id, sessions_dir=SESSIONS_DIR):
+    return sessions_dir / f"{safe_session_id(session_id)}.json"
+
+def read_session_file(path):
+    """Return the status dict stored at path, or None if unreadable"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error loading session data from {path}: {e}")
+        return None
+
+def status_changed(current, data):
+    """True if data should replace current
+
+    Prefers the writer's updated_at stamp so stale or echoed snapshots are
+    ignored; falls back to a field comparison for writers without one.
+    """
+    if 'updated_at' in current and 'updated_at' in data:
+        return data['updated_at'] > current['updated_at']
+    return any(current.get(k) != v for k, v in data.items())
+
+class SessionStore:
+    """Sessions sorted by ID with running combined totals
+
+    The sorted order doubles as the row index of the HUD's session list, so
+    an update tells the caller exactly which single row to repaint.
+    """
+
+    def __init__(self):
+        self.sessions = {}
+        self.order = []
+        self.used = 0
+        self.total = 0
+        self.updated_at = 0.0
+
+    def __len__(self):
+        return len(self.order)
+
+    def update(self, session_id, data):
+        """Apply a status; returns (row, inserted) or None if nothing changed"""
+        row = bisect.bisect_left(self.order, session_id)
+        old = self.sessions.get(session_id)
+
+        if old is None:
+            self.order.insert(row, session_id)
+            inserted = True
+        elif status_changed(old, data):
+            self.used -= old['used']
+            self.total -= old['total']
+            inserted = False
+        else:
+            return None
+
+        self.sessions[session_id] = data
+        self.used += data['used']
+        self.total += data['total']
+        self.updated_at = max(self.updated_at, data.get('updated_at', 0))
+        return row, inserted
+
+    def remove(self, session_id):
+        """Forget a session; returns its former row or None if unknown"""
+        old = self.sessions.pop(session_id, None)
+        if old is None:
+            return None
+
+        row = bisect.bisect_left(self.order, session_id)
+        del self.order[row]
+        self.used -= old['used']
+        self.total -= old['total']
+        return row
@@ -44,16 +44,7 @@ echo ""
 echo "Profile to Image Mapping:"
 echo "========================="
 echo ""
-echo "Forest_MistyMorning       -> $IMAGES_DIR/01_misty_morning.png"
-echo "Forest_DarkEvergreen      -> $IMAGES_DIR/02_dark_evergreen.png"
-echo "Forest_AutumnGlow         -> $IMAGES_DIR/03_autumn_glow.png"
-echo "Forest_BambooZen          -> $IMAGES_DIR/04_bamboo_zen.png"
-echo "Forest_SnowyPines         -> $IMAGES_DIR/05_snowy_pines.png"
-echo "Forest_TropicalRainforest -> $IMAGES_DIR/06_tropical_rainforest.png"
-echo "Forest_SunsetCanopy       -> $IMAGES_DIR/07_sunset_canopy.png"
-echo "Forest_MossyGrove         -> $IMAGES_DIR/08_mossy_grove.png"
-echo "Forest_BirchMinimal       -> $IMAGES_DIR/09_birch_minimal.png"
-echo "Forest_NightForest        -> $IMAGES_DIR/10_night_forest.png"
+python3 "$(dirname "$0")/forest_manifest.py"
 echo ""
 echo "================================================"
 echo "Profiles are ready to use in Konsole!"
@@ -9,29 +9,16 @@ from pathlib import Path
 # Import the profile creator
 sys.path.insert(0, str(Path(__file__).parent))
 from create_konsole_profiles import create_konsole_profiles, create_wallpaper_script
+from forest_manifest import MANIFEST_FILE, load_images_info
 
 def main():
-    # Get all generated images
-    images_dir = Path.home() / "Pictures" / "konsole_forests"
-
-    if not images_dir.exists():
-        print("Error: No forest images found. Run generate_forest_collection.py first.")
+    # Images the last generate_forest_collection.py run completed
+    images_info = load_images_info()
+    if not images_info:
+        print(f"Error: No forest images recorded in {MANIFEST_FILE}.")
+        print("Run generate_forest_collection.py first (--resume records images already on disk).")
         return
 
-    # Get image info
-    images_info = [
-        {'path': str(images_dir / "01_misty_morning.png"), 'name': 'misty_morning', 'colors': 'light', 'number': 1},
-        {'path': str(images_dir / "02_dark_evergreen.png"), 'name': 'dark_evergreen', 'colors': 'bright', 'number': 2},
-        {'path': str(images_dir / "03_autumn_glow.png"), 'name': 'autumn_glow', 'colors': 'dark', 'number': 3},
-        {'path': str(images_dir / "04_bamboo_zen.png"), 'name': 'bamboo_zen', 'colors': 'medium', 'number': 4},
-        {'path': str(images_dir / "05_snowy_pines.png"), 'name': 'snowy_pines', 'colors': 'dark', 'number': 5},
-        {'path': str(images_dir / "06_tropical_rainforest.png"), 'name': 'tropical_rainforest', 'colors': 'bright', 'number': 6},
-        {'path': str(images_dir / "07_sunset_canopy.png"), 'name': 'sunset_canopy', 'colors': 'bright', 'number': 7},
-        {'path': str(images_dir / "08_mossy_grove.png"), 'name': 'mossy_grove', 'colors': 'light', 'number': 8},
-        {'path': str(images_dir / "09_birch_minimal.png"), 'name': 'birch_minimal', 'colors': 'dark', 'number': 9},
-        {'path': str(images_dir / "10_night_forest.png"), 'name': 'night_forest', 'colors': 'bright', 'number': 10},
-    ]
-
     print("=" * 70)
     print("Setting Up Konsole Forest Profiles")
     print("=" * 70)
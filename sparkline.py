@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Sparkline widget for the Token HUD
+Draws usage history on one Canvas and updates it incrementally
+"""
+
+import tkinter as tk
+from collections import deque
+
+class Sparkline:
+    """Percentage-used trend drawn as one line segment per sample
+
+    New samples shift the existing segments left with a single Canvas move
+    and add one segment on the right; the oldest segment is deleted once the
+    line spans the full width. Nothing is redrawn from scratch.
+
+    Pass canvas (with an x, y offset and a unique tag) to draw into an
+    existing Canvas instead of creating one.
+    """
+
+    def __init__(self, parent, width=270, height=24, points=90, color='#4ec9b0', bg='#1e1e1e',
+                 canvas=None, x=0, y=0, tag='segment'):
+        self.width = width
+        self.height = height
+        self.step = width / (points - 1)
+        self.points = points
+        self.color = color
+        self.segments = deque()
+        self.last_y = None
+        self.x = x
+        self.y = y
+        self.tag = tag
+
+        if canvas is None:
+            canvas = tk.Canvas(
+                parent,
+                width=width,
+                height=height,
+                bg=bg,
+                bd=0,
+                highlightthickness=0
+            )
+        self.canvas = canvas
+
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+
+    def y_for(self, fraction_used):
+        # 1 px margin top and bottom so the line is never clipped
+        fraction_used = min(max(fraction_used, 0.0), 1.0)
+        return self.y + 1 + (1 - fraction_used) * (self.height - 2)
+
+    def push(self, used, total):
+        """Append one sample at the right edge; returns the Canvas calls made"""
+        y = self.y_for(used / total if total > 0 else 0.0)
+        calls = 0
+
+        if self.last_y is not None:
+            right = self.x + self.width
+            self.canvas.move(self.tag, -self.step, 0)
+            self.segments.append(self.canvas.create_line(
+                right - self.step, self.last_y, right, y,
+                fill=self.color, width=1, tags=self.tag
+            ))
+            calls = 2
+            if len(self.segments) >= self.points:
+                self.canvas.delete(self.segments.popleft())
+                calls += 1
+
+        self.last_y = y
+        return calls
+
+    def extend(self, samples):
+        """Replay (timestamp, used, total) samples, e.g. from UsageHistory.latest"""
+        for timestamp, used, total in samples:
+            self.push(used, total)
+
+    def set_color(self, color):
+        if color == self.color:
+            return 0
+        self.color = color
+        self.canvas.itemconfig(self.tag, fill=color)
+        return 1
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+One-line token usage summary for shell prompts, tmux and statusLine hooks
+Reads a 40-byte binary snapshot written next to token_status.json, so a
+run costs little more than interpreter startup
+
+Only os, struct, sys and time are imported up front: pathlib and argparse
+alone would take most of the 20 ms budget.
+"""
+
+import os
+import struct
+import sys
+import time
+
+from hud_render import band
+
+# used, total, remaining, percentage, updated_at (the shm segment's payload)
+SNAPSHOT = struct.Struct('<qqqdd')
+SNAPSHOT_FILE = os.path.join(os.path.expanduser('~'), '.claude', 'token_status.bin')
+STATUS_JSON = os.path.join(os.path.expanduser('~'), '.claude', 'token_status.json')
+
+DEFAULT_FORMAT = "{color}{remaining:,}{reset} tokens left ({percentage:.0f}%) {bar}"
+
+ANSI = {
+    'low': '\033[31m',
+    'warning': '\033[33m',
+    'ok': '\033[36m'
+}
+RESET = '\033[0m'
+
+BAR_CELLS = 10
+
+# Median startup time above which --bench fails (and exits 1)
+BUDGET_MS = 20.0
+
+def write_snapshot(data, path=SNAPSHOT_FILE):
+    """Replace the binary snapshot atomically"""
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        os.write(fd, SNAPSHOT.pack(
+            int(data['used']), int(data['total']), int(data['remaining']),
+            float(data['percentage']), float(data.get('updated_at') or time.time())
+        ))
+    finally:
+        os.close(fd)
+    os.replace(tmp_file, path)
+
+def read_snapshot(path=SNAPSHOT_FILE):
+    """Return the snapshot as a status dict, or None if there is none"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        raw = os.read(fd, SNAPSHOT.size)
+    finally:
+        os.close(fd)
+    if len(raw) != SNAPSHOT.size:
+        return None
+    used, total, remaining, percentage, updated_at = SNAPSHOT.unpack(raw)
+    return {
+        'used': used,
+        'total': total,
+        'remaining': remaining,
+        'percentage': percentage,
+        'updated_at': updated_at
+    }
+
+def read_status():
+    """Snapshot, or the JSON status file when it is newer (writers that predate the snapshot)"""
+    try:
+        json_mtime = os.stat(STATUS_JSON).st_mtime_ns
+    except OSError:
+        json_mtime = None
+    try:
+        stale = json_mtime is not None and os.stat(SNAPSHOT_FILE).st_mtime_ns < json_mtime
+    except OSError:
+        stale = json_mtime is not None
+    if not stale:
+        return read_snapshot()
+    return refresh_snapshot()
+
+def refresh_snapshot():
+    """Read the JSON status file and rewrite the snapshot from it
+
+    The only path that imports json; afterwards the snapshot is current
+    again, so the next run reads it.
+    """
+    import json
+    try:
+        with open(STATUS_JSON, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return read_snapshot()
+    try:
+        write_snapshot(data)
+    except (OSError, KeyError, TypeError, ValueError):
+        pass
+    return data
+
+def format_status(data, fmt=DEFAULT_FORMAT, color=True):
+    """Format a status; fields are the status keys plus age, bar, band, color and reset"""
+    percentage = data['percentage']
+    filled = round(min(max(percentage, 0), 100) / 100 * BAR_CELLS)
+    name = band(percentage)
+    fields = dict(data)
+    fields.update(
+        age=int(time.time() - data.get('updated_at', time.time())),
+        bar='█' * filled + '░' * (BAR_CELLS - filled),
+        band=name,
+        color=ANSI[name] if color else '',
+        reset=RESET if color else ''
+    )
+    return fmt.format_map(fields)
+
+def benchmark(runs=30, budget_ms=BUDGET_MS):
+    """Time 'tokenhud status' in fresh interpreters; returns False if over budget
+
+    Runs against a throwaway HOME holding a current snapshot, so the
+    result does not depend on what the real status files look like.
+    """
+    import subprocess
+    import tempfile
+
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tokenhud'),
+               'status']
+    baseline = [sys.executable, '-c', 'pass']
+
+    def median_ms(argv, env):
+        # One untimed run warms the page cache and __pycache__
+        subprocess.run(argv, stdout=subprocess.DEVNULL, check=True, env=env)
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(argv, stdout=subprocess.DEVNULL, check=True, env=env)
+            times.append((time.perf_counter() - start) * 1000)
+        times.sort()
+        return times[len(times) // 2], times[int(len(times) * 0.9)]
+
+    with tempfile.TemporaryDirectory() as home:
+        os.mkdir(os.path.join(home, '.claude'))
+        write_snapshot({'used': 150000, 'total': 200000, 'remaining': 50000, 'percentage': 25.0},
+                       os.path.join(home, '.claude', 'token_status.bin'))
+        env = dict(os.environ, HOME=home)
+        floor, _ = median_ms(baseline, env)
+        median, p90 = median_ms(command, env)
+    print(f"Interpreter floor: {floor:.1f} ms")
+    print(f"tokenhud status:   {median:.1f} ms median, {p90:.1f} ms p90 over {runs} runs")
+    print(f"Budget:            {budget_ms:.1f} ms median")
+    ok = median <= budget_ms
+    print("PASS" if ok else "FAIL")
+    return ok
+
+USAGE = f"""Usage: tokenhud status [--format FMT] [--no-color] [--bench [--runs N] [--budget-ms MS]]
+
+Fields: {{used}} {{total}} {{remaining}} {{percentage}} {{updated_at}} {{age}}
+        {{bar}} {{band}} {{color}} {{reset}}
+Default format: {DEFAULT_FORMAT!r}"""
+
+def main():
+    # Hand-rolled option parsing: importing argparse would double the runtime
+    fmt = DEFAULT_FORMAT
+    color = 'NO_COLOR' not in os.environ
+    bench = False
+    runs = 30
+    budget_ms = BUDGET_MS
+
+    args = sys.argv[1:]
+    try:
+        while args:
+            arg = args.pop(0)
+            if arg == '--format':
+                fmt = args.pop(0)
+            elif arg == '--no-color':
+                color = False
+            elif arg == '--bench':
+                bench = True
+            elif arg == '--runs':
+                runs = int(args.pop(0))
+            elif arg == '--budget-ms':
+                budget_ms = float(args.pop(0))
+            elif arg in ('-h', '--help'):
+                print(USAGE)
+                return
+            else:
+                raise ValueError(f"unknown option {arg}")
+    except (IndexError, ValueError) as e:
+        print(f"Error: {e or 'missing option value'}\n{USAGE}", file=sys.stderr)
+        sys.exit(2)
+
+    if bench:
+        sys.exit(0 if benchmark(runs, budget_ms) else 1)
+
+    data = read_status()
+    if data is None:
+        print("tokens: –")
+        return
+    try:
+        print(format_status(data, fmt, color))
+    except (KeyError, ValueError, IndexError) as e:
+        print(f"Error in format string: {e}", file=sys.stderr)
+        sys.exit(2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Shared-memory status segment for the Token HUD
+Fixed binary layout published with a seqlock, so readers get a consistent
+snapshot without locks or JSON parsing
+
+Layout (little-endian, 48 bytes):
+    0   uint64  sequence (odd while a write is in progress)
+    8   int64   used
+    16  int64   total
+    24  int64   remaining
+    32  float64 percentage
+    40  float64 updated_at
+"""
+
+import fcntl
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_SEQ = struct.Struct('<Q')
+_PAYLOAD = struct.Struct('<qqqdd')
+PAYLOAD_OFFSET = _SEQ.size
+SEGMENT_SIZE = _SEQ.size + _PAYLOAD.size
+
+FIELDS = ('used', 'total', 'remaining', 'percentage', 'updated_at')
+
+# A writer that died mid-publish leaves the sequence odd; stop spinning then
+SPIN_LIMIT = 10000
+
+def default_segment_path():
+    """Per-user segment under /dev/shm, or ~/.claude when there is no tmpfs"""
+    shm_dir = Path('/dev/shm')
+    if shm_dir.is_dir():
+        return shm_dir / f"token_hud_status.{os.getuid()}"
+    return Path.home() / '.claude' / 'token_hud_status.shm'
+
+SEGMENT_PATH = default_segment_path()
+
+class StatusSegment:
+    """mmap-backed status segment
+
+    Writers serialise among themselves with flock(); readers never lock and
+    simply retry while the sequence number is odd or changed underneath them.
+    """
+
+    def __init__(self, path=SEGMENT_PATH, create=False):
+        self.path = Path(path)
+        flags = os.O_RDWR | (os.O_CREAT if create else 0)
+        self.fd = os.open(self.path, flags, 0o600)
+        if os.fstat(self.fd).st_size < SEGMENT_SIZE:
+            os.ftruncate(self.fd, SEGMENT_SIZE)
+        self.mm = mmap.mmap(self.fd, SEGMENT_SIZE)
+
+    @classmethod
+    def open_existing(cls, path=SEGMENT_PATH):
+        """Attach to a segment a HUD created, or return None if there is none"""
+        try:
+            return cls(path)
+        except FileNotFoundError:
+            return None
+
+    def sequence(self):
+        """Current sequence number; cheap enough to poll for changes"""
+        return _SEQ.unpack_from(self.mm, 0)[0]
+
+    def publish(self, used, total, remaining, percentage, updated_at):
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            seq = _SEQ.unpack_from(self.mm, 0)[0] | 1
+            _SEQ.pack_into(self.mm, 0, seq)
+            _PAYLOAD.pack_into(
+                self.mm, PAYLOAD_OFFSET,
+                used, total, remaining, percentage, updated_at
+            )
+            _SEQ.pack_into(self.mm, 0, seq + 1)
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def publish_status(self, data):
+        self.publish(*(data[field] for field in FIELDS))
+
+    def read(self):
+        """Return (sequence, payload tuple) from a consistent snapshot
+
+        Returns None if no consistent snapshot was seen within SPIN_LIMIT
+        tries, e.g. because a writer died mid-publish.
+        """
+        mm = self.mm
+        for _ in range(SPIN_LIMIT):
+            before = _SEQ.unpack_from(mm, 0)[0]
+            if before & 1:
+                continue
+            payload = _PAYLOAD.unpack_from(mm, PAYLOAD_OFFSET)
+            if _SEQ.unpack_from(mm, 0)[0] == before:
+                return before, payload
+        return None
+
+    def read_status(self):
+        """Return (sequence, status dict), or None; sequence 0 means never written"""
+        snapshot = self.read()
+        if snapshot is None:
+            return None
+        seq, payload = snapshot
+        return seq, dict(zip(FIELDS, payload))
+
+    def close(self):
+        self.mm.close()
+        os.close(self.fd)
+
+def benchmark(iterations=200000):
+    """Compare a seqlock snapshot read against open() + json.load()"""
+    data = {
+        'used': 25000,
+        'total': 200000,
+        'remaining': 175000,
+        'percentage': 87.5,
+        'updated_at': time.time()
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        status_file = Path(tmp_dir) / 'token_status.json'
+        with open(status_file, 'w') as f:
+            json.dump(data, f, indent=2)
+
+        segment = StatusSegment(Path(tmp_dir) / 'status.shm', create=True)
+        segment.publish_status(data)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            with open(status_file, 'r') as f:
+                json.load(f)
+        json_ns = (time.perf_counter() - start) / iterations * 1e9
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            segment.read()
+        shm_ns = (time.perf_counter() - start) / iterations * 1e9
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            segment.sequence()
+        seq_ns = (time.perf_counter() - start) / iterations * 1e9
+
+        segment.close()
+
+    print(f"Iterations:          {iterations:,}")
+    print(f"JSON file read:      {json_ns:10.0f} ns/read")
+    print(f"Seqlock snapshot:    {shm_ns:10.0f} ns/read ({json_ns / shm_ns:.0f}x faster)")
+    print(f"Sequence poll only:  {seq_ns:10.0f} ns/read")
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+        benchmark(iterations)
+        return
+
+    segment = StatusSegment.open_existing()
+    if segment is None:
+        print(f"No status segment at {SEGMENT_PATH} (start the HUD with --shm)")
+        sys.exit(1)
+
+    snapshot = segment.read_status()
+    segment.close()
+    if snapshot is None:
+        print(f"Error: no consistent snapshot in {SEGMENT_PATH} (a writer may have died mid-publish)")
+        sys.exit(1)
+    seq, status = snapshot
+    print(f"seq={seq} " + " ".join(f"{k}={v}" for k, v in status.items()))
+
+if __name__ == '__main__':
+    main()
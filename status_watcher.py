@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Status file watcher for the Token HUD
+Uses inotify when available and falls back to cheap stat() polling
+"""
+
+import ctypes
+import ctypes.util
+import os
+import struct
+from pathlib import Path
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# struct inotify_event header: wd, mask, cookie, len (name follows)
+_EVENT_HEADER = struct.Struct('iIII')
+
+def _load_libc():
+    """Return libc with the inotify functions, or None if unavailable"""
+    name = ctypes.util.find_library('c')
+    if not name:
+        return None
+    try:
+        libc = ctypes.CDLL(name, use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+def _inotify_watch(directory, mask):
+    """Return a non-blocking inotify descriptor watching directory, or None"""
+    libc = _load_libc()
+    if libc is None:
+        return None
+
+    fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    if fd < 0:
+        return None
+
+    if libc.inotify_add_watch(fd, os.fsencode(str(directory)), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+def _read_events(fd):
+    """Yield (mask, name) for every queued inotify event"""
+    while True:
+        try:
+            buf = os.read(fd, 4096)
+        except BlockingIOError:
+            return
+        if not buf:
+            return
+
+        offset = 0
+        while offset < len(buf):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+            offset += _EVENT_HEADER.size
+            yield mask, buf[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+def _stat_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+class StatusWatcher:
+    """Watch a single file and report when it has been modified or replaced
+
+    In inotify mode the parent directory is watched so atomic
+    temp-file-plus-rename writes are seen as well as in-place rewrites.
+    Only completed writes (close after write, rename into place) count,
+    so a reader is never woken halfway through a writer's json.dump.
+    """
+
+    def __init__(self, path, use_inotify=True):
+        self.path = Path(path)
+        self.fd = None
+        self.mode = 'stat'
+        self._name = os.fsencode(self.path.name)
+        self._signature = _stat_signature(self.path)
+
+        if use_inotify:
+            self.fd = _inotify_watch(self.path.parent, IN_CLOSE_WRITE | IN_MOVED_TO)
+            if self.fd is not None:
+                self.mode = 'inotify'
+
+    def fileno(self):
+        """inotify descriptor to register with an event loop, or None"""
+        return self.fd
+
+    def check(self):
+        """Return True if the file changed since the last call"""
+        if self.fd is not None:
+            changed = False
+            for mask, name in _read_events(self.fd):
+                if mask & IN_Q_OVERFLOW or name == self._name:
+                    changed = True
+            return changed
+
+        signature = _stat_signature(self.path)
+        if signature != self._signature:
+            self._signature = signature
+            return True
+        return False
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+class DirectoryWatcher:
+    """Report which files in a directory were written, replaced or removed
+
+    Dot-files (writers' temp files) and names without the suffix are
+    ignored. In stat mode every entry is stat()ed per check, so callers
+    should poll it sparingly.
+    """
+
+    def __init__(self, path, suffix='.json', use_inotify=True):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.suffix = suffix
+        self.fd = None
+        self.mode = 'stat'
+        self._signatures = {}
+
+        if use_inotify:
+            self.fd = _inotify_watch(
+                self.path, IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+            )
+            if self.fd is not None:
+                self.mode = 'inotify'
+
+    def fileno(self):
+        return self.fd
+
+    def _wanted(self, name):
+        return not name.startswith('.') and name.endswith(self.suffix)
+
+    def scan(self):
+        """Return (changed, removed) name sets by comparing stat signatures"""
+        current = {}
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if self._wanted(entry.name):
+                    current[entry.name] = _stat_signature(entry.path)
+
+        changed = {name for name, sig in current.items()
+                   if self._signatures.get(name) != sig}
+        removed = set(self._signatures) - set(current)
+        self._signatures = current
+        return changed, removed
+
+    def check(self):
+        """Return (changed, removed) name sets since the last call"""
+        if self.fd is None:
+            return self.scan()
+
+        changed = set()
+        removed = set()
+        for mask, raw_name in _read_events(self.fd):
+            if mask & IN_Q_OVERFLOW:
+                return self.scan()
+
+            name = os.fsdecode(raw_name)
+            if not self._wanted(name):
+                continue
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                removed.add(name)
+                changed.discard(name)
+            else:
+                changed.add(name)
+                removed.discard(name)
+        return changed, removed
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
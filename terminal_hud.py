@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Terminal HUD for machines without a display
+The Token HUD drawn with curses from the same background reader as the Tk
+window, repainting only the cells whose character or color changed
+"""
+
+import argparse
+import curses
+import os
+import queue
+import select
+import sys
+import time
+
+from forecast import BurnRateEstimator, format_eta, format_rate
+from hud_io import StatusReader
+from hud_render import band
+from hud_scheduler import RefreshScheduler
+from hud_socket import acquire_instance_lock
+from sessions import DEFAULT_SESSION, SessionStore, status_changed
+from update_tokens import STATUS_FILE, build_status
+from usage_history import UsageHistory
+
+# Widest the HUD grows in a wide terminal
+MAX_WIDTH = 60
+
+# Visible session rows in --sessions mode
+SESSION_ROWS = 8
+
+SPARK_LEVELS = '▁▂▃▄▅▆▇█'
+
+# curses color numbers for each band: 256-color approximations of the Tk
+# colors, and the basic 8-color fallbacks
+BAND_COLORS_256 = {'low': 203, 'warning': 214, 'ok': 79}
+BAND_COLORS_8 = {'low': curses.COLOR_RED, 'warning': curses.COLOR_YELLOW, 'ok': curses.COLOR_CYAN}
+
+class CellScreen:
+    """Last drawn (character, attribute) of every cell, per row
+
+    draw() compares a row with what is on screen and writes only the runs
+    of cells that differ, so an unchanged HUD sends nothing to curses.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.rows = {}
+        self.cells_written = 0
+
+    def draw(self, row, segments):
+        cells = [(ch, attr) for text, attr in segments for ch in text]
+        old = self.rows.get(row, [])
+        width = max(len(old), len(cells))
+        cells += [(' ', 0)] * (width - len(cells))
+
+        i = 0
+        while i < width:
+            if i < len(old) and old[i] == cells[i]:
+                i += 1
+                continue
+            start, attr = i, cells[i][1]
+            while i < width and (i >= len(old) or old[i] != cells[i]) and cells[i][1] == attr:
+                i += 1
+            try:
+                self.window.addstr(row, start, ''.join(ch for ch, _ in cells[start:i]), attr)
+            except curses.error:
+                pass  # Writing the bottom-right cell moves the cursor off screen
+            self.cells_written += i - start
+
+        self.rows[row] = cells
+
+    def reset(self):
+        """Forget everything, e.g. after a resize"""
+        self.rows.clear()
+        self.window.erase()
+
+class TerminalHUD:
+    def __init__(self, stdscr, show_sessions=False, use_shm=False, ingest=False):
+        self.stdscr = stdscr
+        self.screen = CellScreen(stdscr)
+        self.token_data = build_status(0, 200000)
+        self.history = UsageHistory()
+        self.estimator = BurnRateEstimator()
+        self.sessions = SessionStore() if show_sessions else None
+        self.scheduler = RefreshScheduler()
+        self.band_attrs = self.init_colors()
+        self.running = True
+        self.hidden = False
+
+        self.reader = StatusReader(
+            STATUS_FILE,
+            show_sessions=show_sessions,
+            use_shm=use_shm,
+            ingest=ingest,
+            history_points=MAX_WIDTH,
+            scheduler=self.scheduler
+        )
+
+    def init_colors(self):
+        attrs = {name: curses.A_BOLD for name in BAND_COLORS_8}
+        if not curses.has_colors():
+            return attrs
+        curses.start_color()
+        try:
+            curses.use_default_colors()
+            background = -1
+        except curses.error:
+            background = curses.COLOR_BLACK
+        colors = BAND_COLORS_256 if curses.COLORS >= 256 else BAND_COLORS_8
+        for pair, (name, color) in enumerate(colors.items(), start=1):
+            curses.init_pair(pair, color, background)
+            attrs[name] = curses.color_pair(pair)
+        return attrs
+
+    def run(self):
+        curses.curs_set(0)
+        self.stdscr.nodelay(True)
+        self.reader.start()
+        try:
+            while True:
+                # Data and keys wake us; the timeout is only a backstop
+                interval = self.scheduler.interval_ms()
+                readable, _, _ = select.select(
+                    [self.reader.notify_fd, sys.stdin], [], [], interval / 1000
+                )
+                self.scheduler.wakeup('ui events' if readable else 'ui ticks')
+
+                if self.reader.notify_fd in readable:
+                    self.reader.drain_notify()
+                if not self.handle_keys():
+                    return
+                self.poll_queue()
+                if not self.running:
+                    return
+                if not self.hidden:
+                    self.render()
+        finally:
+            self.reader.stop()
+
+    def handle_keys(self):
+        """Returns False when the user asked to quit"""
+        while True:
+            key = self.stdscr.getch()
+            if key == -1:
+                return True
+            if key in (ord('q'), ord('Q')):
+                return False
+            if key == curses.KEY_RESIZE:
+                curses.update_lines_cols()
+                self.screen.reset()
+
+    def poll_queue(self):
+        """Apply everything the reader thread finished since the last wakeup"""
+        try:
+            while True:
+                message = self.reader.queue.get_nowait()
+                kind = message[0]
+                if kind == 'status':
+                    self.apply_status(message[1], message[2])
+                elif kind == 'session':
+                    if self.sessions.update(message[1], message[2]) is not None:
+                        self.show_combined()
+                elif kind == 'session_removed':
+                    if self.sessions.remove(message[1]) is not None:
+                        self.show_combined()
+                elif kind == 'initial':
+                    if self.sessions is not None:
+                        self.apply_status(message[1])
+                    else:
+                        self.token_data.update(message[1])
+                elif kind == 'history':
+                    for timestamp, used, total, remaining, percentage, key in message[1]:
+                        self.history.append(timestamp, used, total)
+                        self.estimator.update(timestamp, used)
+                elif kind == 'command':
+                    self.run_command(message[1], message[2])
+        except queue.Empty:
+            pass
+
+    def run_command(self, command, args):
+        """Carry out a command forwarded by another launch; move has no meaning here"""
+        if command == 'toggle':
+            command = 'show' if self.hidden else 'hide'
+
+        if command in ('show', 'hide'):
+            self.hidden = command == 'hide'
+            # Blank the screen on hide; redraw every cell on show
+            self.screen.reset()
+            self.stdscr.refresh()
+        elif command == 'quit':
+            self.running = False
+
+    def apply_status(self, data, session=None):
+        if self.sessions is not None:
+            if self.sessions.update(session or DEFAULT_SESSION, data) is not None:
+                self.show_combined()
+            return
+
+        # Keyed updates are only tracked in sessions mode
+        if session is not None or not status_changed(self.token_data, data):
+            return
+        self.token_data.update(data)
+        self.record_sample()
+
+    def show_combined(self):
+        store = self.sessions
+        self.token_data.update(build_status(store.used, store.total, store.updated_at))
+        self.record_sample()
+
+    def record_sample(self):
+        data = self.token_data
+        timestamp = data.get('updated_at', time.time())
+        self.history.append(timestamp, data['used'], data['total'])
+        self.estimator.update(timestamp, data['used'])
+        self.scheduler.set_rate(self.estimator.rate_per_minute())
+
+    def render(self):
+        data = self.token_data
+        width = max(20, min(curses.COLS - 1, MAX_WIDTH))
+        color = self.band_attrs[band(data['percentage'])]
+        dim = curses.A_DIM
+
+        subtitle = " tokens remaining"
+        if self.sessions is not None:
+            subtitle += f" · {len(self.sessions)} sessions"
+
+        filled = round(min(max(data['percentage'], 0), 100) / 100 * width)
+        forecast = (f"{format_rate(self.estimator.rate_per_minute())}  "
+                    f"{format_eta(self.estimator.eta_seconds(data['remaining']))}")
+
+        spark = ''.join(
+            SPARK_LEVELS[min(int(used / total * len(SPARK_LEVELS)), len(SPARK_LEVELS) - 1)]
+            if total > 0 else SPARK_LEVELS[0]
+            for timestamp, used, total in self.history.latest(width)
+        )
+
+        lines = [
+            [("Claude Code Tokens", curses.A_BOLD), ("  q to quit", dim)],
+            [(f"{data['remaining']:,}", color | curses.A_BOLD), (subtitle, dim)],
+            [('█' * filled, color), ('░' * (width - filled), dim)],
+            [(f"{data['used']:,} / {data['total']:,} ({data['percentage']:.1f}%)", dim),
+             (f"  {forecast}", dim)],
+            [(spark, color)]
+        ]
+
+        if self.sessions is not None:
+            lines.append([])
+            for session in self.sessions.order[:SESSION_ROWS]:
+                status = self.sessions.sessions[session]
+                lines.append([(
+                    f"{session[:18]:<18} {status['remaining']:>9,} {status['percentage']:5.1f}%",
+                    self.band_attrs[band(status['percentage'])]
+                )])
+            # Clear rows left over from sessions that went away
+            for row in range(len(lines), 6 + SESSION_ROWS):
+                lines.append([])
+
+        before = self.screen.cells_written
+        for row, segments in enumerate(lines[:curses.LINES]):
+            self.screen.draw(row, segments)
+        if self.screen.cells_written != before:
+            self.stdscr.refresh()
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='tokenhud term',
+        description="Token HUD in the terminal (curses), for sessions without a display"
+    )
+    parser.add_argument('--sessions', action='store_true', help="show the per-session list")
+    parser.add_argument('--shm', action='store_true', help="read the shared-memory segment")
+    parser.add_argument('--ingest', action='store_true', help="tail Claude Code transcripts")
+    parser.add_argument('--wakeups', action='store_true', help="print wakeups per hour on exit")
+    args = parser.parse_args()
+
+    # The running HUD owns the socket that forwarded commands arrive on
+    lock = acquire_instance_lock()
+    if lock is None:
+        print("Error: a Token HUD is already running; stop it first with 'launch_hud.sh quit'")
+        sys.exit(1)
+
+    # Skip curses' default one-second wait after Escape
+    os.environ.setdefault('ESCDELAY', '25')
+
+    hud = None
+
+    def start(stdscr):
+        nonlocal hud
+        hud = TerminalHUD(stdscr, args.sessions, args.shm, args.ingest)
+        hud.run()
+
+    try:
+        curses.wrapper(start)
+    except KeyboardInterrupt:
+        pass
+    if args.wakeups and hud is not None:
+        print(f"Wakeups: {hud.scheduler.summary()}")
+        print(f"Cells written: {hud.screen.cells_written:,}")
+
+if __name__ == '__main__':
+    main()
@@ -6,13 +6,44 @@ Displays live token usage for Claude Code sessions
 
 import tkinter as tk
 from tkinter import ttk
-import json
-import os
+import cProfile
+import pstats
+import queue
 from pathlib import Path
+import sys
 import time
 
+from canvas_hud import PANEL_HEIGHT, CanvasBoard
+from forecast import BurnRateEstimator, format_eta, format_rate
+from hud_io import FrameTimer, StatusReader
+from hud_metrics import METRICS_DIR, METRICS_PORT, TEXTFILE_INTERVAL, TextfileExporter
+from hud_metrics import registry as metrics
+from hud_render import DiffRenderer, band_color
+from hud_scheduler import RefreshScheduler
+from hud_socket import acquire_instance_lock, forward_command, parse_commands
+from sessions import DEFAULT_SESSION, SessionStore, status_changed
+from sparkline import Sparkline
+from update_tokens import build_status
+from usage_history import UsageHistory
+
+# Session list: visible rows
+SESSION_ROWS = 8
+SESSION_ROW_HEIGHT = 15
+
+# How often frame-time statistics are printed with --frame-times
+FRAME_REPORT_MS = 10000
+
+# How often wakeup rates are printed with --wakeups
+WAKEUP_REPORT_MS = 60000
+
+# Where --profile saves the combined Tk and reader thread profile
+PROFILE_FILE = Path.home() / '.claude' / 'token_hud.prof'
+PROFILE_LINES = 25
+
 class TokenHUD:
-    def __init__(self):
+    def __init__(self, report_latency=False, use_shm=False, show_sessions=False,
+                 ingest=False, report_frames=False, canvas=False, report_wakeups=False,
+                 metrics_file=False, metrics_http=False, profile=False):
         self.root = tk.Tk()
         self.root.title("Token HUD")
 
@@ -24,7 +55,9 @@ class TokenHUD:
         # Position in top-right corner
         screen_width = self.root.winfo_screenwidth()
         window_width = 300
-        window_height = 120
+        window_height = PANEL_HEIGHT if canvas else 150
+        if show_sessions:
+            window_height += SESSION_ROWS * SESSION_ROW_HEIGHT + 20
         x_position = screen_width - window_width - 20
         y_position = 20
         self.root.geometry(f'{window_width}x{window_height}+{x_position}+{y_position}')
@@ -33,9 +66,12 @@ class TokenHUD:
         self.root.bind('<Button-1>', self.start_move)
         self.root.bind('<B1-Motion>', self.on_move)
 
+        # Stop every timer while withdrawn or minimized
+        self.root.bind('<Map>', self.on_map)
+        self.root.bind('<Unmap>', self.on_unmap)
+
         # Status file path
         self.status_file = Path.home() / '.claude' / 'token_status.json'
-        self.status_file.parent.mkdir(parents=True, exist_ok=True)
 
         # Initialize with default values
         self.token_data = {
@@ -45,9 +81,74 @@ class TokenHUD:
             'percentage': 100.0
         }
 
-        self.create_widgets()
+        # Trend of every displayed update, drawn as a sparkline
+        self.history = UsageHistory()
+        self.estimator = BurnRateEstimator()
+
+        # Delay between a writer stamping 'updated_at' and the repaint
+        self.report_latency = report_latency
+        self.last_latency_ms = None
+        self.started_at = time.time()
+
+        # Time spent in each Tk-thread callback; no file or socket I/O happens here
+        self.report_frames = report_frames
+        self.frame_timer = FrameTimer()
+
+        # Per-session breakdown; None unless launched with --sessions
+        self.sessions = SessionStore() if show_sessions else None
+        self.session_rows = {}
+
+        # Last rendered state; only changed options reach Tk
+        self.renderer = DiffRenderer()
+        self.band = None
+
+        # Single-canvas backend instead of the widget tree, with --canvas
+        self.board = None
+        self.panel = None
+        if canvas:
+            self.create_canvas()
+        else:
+            self.create_widgets()
         self.update_display()
-        self.auto_update()
+
+        # Refresh cadence adapts to activity; data itself arrives by wakeup
+        self.scheduler = RefreshScheduler()
+        self.report_wakeups = report_wakeups
+        self.tick_id = None
+
+        # Every file, socket and shm read happens on the reader thread
+        self.reader = StatusReader(
+            self.status_file,
+            show_sessions=show_sessions,
+            use_shm=use_shm,
+            ingest=ingest,
+            history_points=self.sparkline.points,
+            scheduler=self.scheduler,
+            profile=profile
+        )
+        self.profiler = cProfile.Profile() if profile else None
+        self.root.tk.createfilehandler(self.reader.notify_fd, tk.READABLE, self.on_notify)
+        # Enabled before the reader starts: on Python 3.12+ this one profiler
+        # covers both threads, and a second enable() would raise ValueError
+        if self.profiler is not None:
+            self.profiler.enable()
+        self.reader.start()
+        self.schedule_tick()
+        if report_frames:
+            self.root.after(FRAME_REPORT_MS, self.report_frame_times)
+        if report_wakeups:
+            self.root.after(WAKEUP_REPORT_MS, self.report_wakeup_rate)
+
+        # Prometheus export: a textfile for node_exporter and/or localhost HTTP
+        self.exporter = None
+        if metrics_file:
+            self.exporter = TextfileExporter(metrics, METRICS_DIR / 'token_hud.prom')
+            self.root.after(TEXTFILE_INTERVAL * 1000, self.export_metrics)
+        if metrics_http:
+            try:
+                metrics.serve(METRICS_PORT)
+            except OSError as e:
+                print(f"Error starting metrics endpoint on port {METRICS_PORT}: {e}")
 
     def create_widgets(self):
         # Main frame with dark theme
@@ -86,14 +187,28 @@ class TokenHUD:
         separator.pack(fill=tk.X, pady=(5, 10))
 
         # Token count display
+        value_frame = tk.Frame(main_frame, bg='#1e1e1e')
+        value_frame.pack()
+
         self.remaining_label = tk.Label(
-            main_frame,
+            value_frame,
             text="0",
             font=('Segoe UI', 24, 'bold'),
             bg='#1e1e1e',
             fg='#4ec9b0'
         )
-        self.remaining_label.pack()
+        self.remaining_label.pack(side=tk.LEFT)
+
+        # Burn rate and time to exhaustion, next to the remaining count
+        self.forecast_label = tk.Label(
+            value_frame,
+            text=f"{format_rate(None)}\n{format_eta(None)}",
+            font=('Segoe UI', 8),
+            bg='#1e1e1e',
+            fg='#808080',
+            justify=tk.LEFT
+        )
+        self.forecast_label.pack(side=tk.LEFT, padx=(8, 0))
 
         self.subtitle_label = tk.Label(
             main_frame,
@@ -105,9 +220,9 @@ class TokenHUD:
         self.subtitle_label.pack()
 
         # Progress bar
-        style = ttk.Style()
-        style.theme_use('default')
-        style.configure(
+        self.style = ttk.Style()
+        self.style.theme_use('default')
+        self.style.configure(
             "Token.Horizontal.TProgressbar",
             troughcolor='#2d2d2d',
             background='#4ec9b0',
@@ -134,67 +249,360 @@ class TokenHUD:
         )
         self.stats_label.pack()
 
+        self.sparkline = Sparkline(main_frame)
+        self.sparkline.pack(pady=(4, 0))
+
+        if self.sessions is not None:
+            self.create_session_list(main_frame)
+
+    def create_canvas(self):
+        """Draw the HUD as one panel on a single Canvas"""
+        self.board = CanvasBoard(self.root)
+        self.board.pack(fill=tk.X)
+        self.panel = self.board.add_panel(on_close=self.root.quit)
+
+        # The panel's items stand in for the widget tree's labels
+        self.remaining_label = self.panel.remaining_label
+        self.forecast_label = self.panel.forecast_label
+        self.subtitle_label = self.panel.subtitle_label
+        self.stats_label = self.panel.stats_label
+        self.progress = self.panel.progress
+        self.sparkline = self.panel.sparkline
+        self.renderer.config(self.forecast_label, text=f"{format_rate(None)}\n{format_eta(None)}")
+
+        if self.sessions is not None:
+            frame = tk.Frame(self.root, bg='#1e1e1e', padx=15, pady=10)
+            frame.pack(fill=tk.BOTH, expand=True)
+            self.create_session_list(frame)
+
+    def create_session_list(self, parent):
+        """Session breakdown: one Listbox however many sessions there are"""
+        list_frame = tk.Frame(parent, bg='#1e1e1e')
+        list_frame.pack(fill=tk.BOTH, expand=True, pady=(8, 0))
+
+        scrollbar = tk.Scrollbar(list_frame, orient=tk.VERTICAL)
+        self.session_list = tk.Listbox(
+            list_frame,
+            height=SESSION_ROWS,
+            font=('DejaVu Sans Mono', 8),
+            bg='#1e1e1e',
+            fg='#808080',
+            bd=0,
+            highlightthickness=0,
+            activestyle='none',
+            selectbackground='#2d2d2d',
+            yscrollcommand=scrollbar.set
+        )
+        scrollbar.config(command=self.session_list.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.session_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
     def update_display(self):
         """Update the display with current token data"""
+        start = time.perf_counter()
+        if self.panel is not None:
+            self.panel.render(self.renderer, self.token_data)
+        else:
+            self.render_widgets()
+        metrics.since('tokenhud_render_seconds', start)
+
+    def render_widgets(self):
+        """Paint the widget tree through the DiffRenderer"""
         remaining = self.token_data['remaining']
         used = self.token_data['used']
         total = self.token_data['total']
         percentage = self.token_data['percentage']
 
+        render = self.renderer
+
         # Update main label with formatted number
-        self.remaining_label.config(text=f"{remaining:,}")
+        render.config(self.remaining_label, text=f"{remaining:,}")
 
         # Update stats label
-        self.stats_label.config(text=f"{used:,} / {total:,} ({percentage:.1f}%)")
+        render.config(self.stats_label, text=f"{used:,} / {total:,} ({percentage:.1f}%)")
 
-        # Update progress bar
-        self.progress['value'] = percentage
+        # Update progress bar; it is 270 px wide, so 0.1% steps are below a pixel
+        render.set(self.progress, 'value', round(percentage, 1))
 
-        # Change color based on remaining percentage
-        if percentage < 10:
-            color = '#ff5555'  # Red
-        elif percentage < 25:
-            color = '#ffaa00'  # Orange
-        else:
-            color = '#4ec9b0'  # Teal
+        # Recolor, and restyle ttk, only when the remaining percentage
+        # crosses into another color band
+        color = band_color(percentage)
+        if color != self.band:
+            self.band = color
+            render.config(self.remaining_label, fg=color)
+            render.count(self.sparkline.set_color(color))
+            render.style(self.style, "Token.Horizontal.TProgressbar", background=color)
 
-        self.remaining_label.config(fg=color)
-        style = ttk.Style()
-        style.configure("Token.Horizontal.TProgressbar", background=color)
+    def update_session(self, session, data):
+        """Store a session's status and repaint just its row"""
+        result = self.sessions.update(session, data)
+        if result is None:
+            return False
 
-    def load_token_data(self):
-        """Load token data from status file"""
-        try:
-            if self.status_file.exists():
-                with open(self.status_file, 'r') as f:
-                    data = json.load(f)
-                    self.token_data.update(data)
-        except Exception as e:
-            print(f"Error loading token data: {e}")
-
-    def auto_update(self):
-        """Automatically update display every second"""
-        self.load_token_data()
+        row, inserted = result
+        data = self.sessions.sessions[session]
+        text = f"{session[:18]:<18} {data['remaining']:>9,} {data['percentage']:5.1f}%"
+        color = band_color(data['percentage'])
+
+        # The totals changed either way, but the row may read the same
+        if not inserted and self.session_rows.get(session) == (text, color):
+            return True
+        self.session_rows[session] = (text, color)
+        if not inserted:
+            self.session_list.delete(row)
+            self.renderer.count()
+        self.session_list.insert(row, text)
+        self.session_list.itemconfig(row, fg=color)
+        self.renderer.count(2)
+        return True
+
+    def remove_session(self, session):
+        row = self.sessions.remove(session)
+        if row is None:
+            return False
+        self.session_rows.pop(session, None)
+        self.session_list.delete(row)
+        self.renderer.count()
+        return True
+
+    def show_combined(self):
+        """Show the combined total of all sessions in the main labels"""
+        store = self.sessions
+        self.token_data.update(build_status(store.used, store.total, store.updated_at))
+        self.renderer.config(self.subtitle_label, text=f"tokens remaining · {len(store)} sessions")
+        self.update_display()
+        self.record_sample()
+        self.measure_latency()
+
+    def apply_status(self, data, session=None):
+        """Paint a snapshot unless a newer one was already shown"""
+        if self.sessions is not None:
+            if self.update_session(session or DEFAULT_SESSION, data):
+                self.show_combined()
+            return
+
+        # Keyed updates are only tracked in sessions mode
+        if session is not None:
+            return
+        if not status_changed(self.token_data, data):
+            metrics.inc('tokenhud_reads_skipped_total', source='stale')
+            return
+        self.token_data.update(data)
         self.update_display()
-        self.root.after(1000, self.auto_update)  # Update every 1 second
+        self.record_sample()
+        self.measure_latency()
+
+    def on_notify(self, fd, mask):
+        self.scheduler.wakeup('ui events')
+        self.reader.drain_notify()
+        self.poll_queue()
+
+    def tick(self):
+        """Backstop drain at the scheduler's current interval"""
+        self.tick_id = None
+        self.scheduler.wakeup('ui ticks')
+        self.poll_queue()
+        self.schedule_tick()
+
+    def schedule_tick(self):
+        interval = self.scheduler.interval_ms()
+        if interval is not None and self.tick_id is None:
+            self.tick_id = self.root.after(interval, self.tick)
+
+    def on_map(self, event):
+        if event.widget is not self.root or self.scheduler.visible:
+            return
+        self.scheduler.set_visible(True)
+        self.scheduler.changed()
+        self.reader.resume()
+        self.schedule_tick()
+
+    def on_unmap(self, event):
+        if event.widget is not self.root:
+            return
+        self.scheduler.set_visible(False)
+        if self.tick_id is not None:
+            self.root.after_cancel(self.tick_id)
+            self.tick_id = None
+
+    def poll_queue(self):
+        """Apply everything the reader thread finished so far"""
+        start = time.perf_counter()
+        painted = False
+        try:
+            while True:
+                message = self.reader.queue.get_nowait()
+                kind = message[0]
+                if kind == 'status':
+                    self.apply_status(message[1], message[2])
+                elif kind == 'session':
+                    painted |= self.update_session(message[1], message[2])
+                elif kind == 'session_removed':
+                    painted |= self.remove_session(message[1])
+                elif kind == 'initial':
+                    self.show_initial(message[1])
+                elif kind == 'history':
+                    self.seed_history(message[1])
+                elif kind == 'command':
+                    self.run_command(message[1], message[2])
+        except queue.Empty:
+            pass
+
+        if painted:
+            self.show_combined()
+        self.renderer.end_tick()
+        self.frame_timer.record(start)
+
+    def run_command(self, command, args):
+        """Carry out a command forwarded by another launch"""
+        if command == 'toggle':
+            command = 'hide' if self.root.state() == 'normal' else 'show'
+
+        if command == 'show':
+            self.root.deiconify()
+            self.root.lift()
+        elif command == 'hide':
+            self.root.withdraw()
+        elif command == 'move':
+            try:
+                x, y = (int(arg) for arg in args)
+            except ValueError:
+                print(f"Error in move command: expected integers, got {' '.join(args)}")
+                return
+            self.root.geometry(f"{x:+d}{y:+d}")
+        elif command == 'quit':
+            self.root.quit()
+
+    def show_initial(self, data):
+        """Show the status file as found at startup, without recording a sample"""
+        if self.sessions is not None:
+            if self.update_session(DEFAULT_SESSION, data):
+                self.show_combined()
+        else:
+            self.token_data.update(data)
+            self.update_display()
+
+    def seed_history(self, records):
+        """Seed the history and sparkline from the durable usage log"""
+        for timestamp, used, total, remaining, percentage, key in records:
+            self.history.append(timestamp, used, total)
+            self.renderer.count(self.sparkline.push(used, total))
+            self.estimator.update(timestamp, used)
+
+    def report_frame_times(self):
+        print(f"Frame times: {self.frame_timer.summary()}")
+        print(f"Rendering: {self.renderer.summary()}")
+        self.root.after(FRAME_REPORT_MS, self.report_frame_times)
+
+    def export_metrics(self):
+        self.exporter.write()
+        self.root.after(TEXTFILE_INTERVAL * 1000, self.export_metrics)
+
+    def dump_profile(self):
+        """Save the Tk and reader thread profiles as one pstats file and print the top"""
+        stats = pstats.Stats(self.profiler)
+        if self.reader.profiler is not None:
+            stats.add(self.reader.profiler)
+        stats.dump_stats(PROFILE_FILE)
+        stats.sort_stats('cumulative').print_stats(PROFILE_LINES)
+        print(f"Profile saved to {PROFILE_FILE} (python3 -m pstats {PROFILE_FILE})")
+
+    def report_wakeup_rate(self):
+        print(f"Wakeups: {self.scheduler.summary()}")
+        self.root.after(WAKEUP_REPORT_MS, self.report_wakeup_rate)
+
+    def record_sample(self):
+        """Append the displayed status to the history, sparkline and forecast"""
+        data = self.token_data
+        timestamp = data.get('updated_at', time.time())
+        self.history.append(timestamp, data['used'], data['total'])
+        self.renderer.count(self.sparkline.push(data['used'], data['total']))
+
+        self.estimator.update(timestamp, data['used'])
+        self.scheduler.set_rate(self.estimator.rate_per_minute())
+        self.renderer.config(self.forecast_label, text=(
+            f"{format_rate(self.estimator.rate_per_minute())}\n"
+            f"{format_eta(self.estimator.eta_seconds(data['remaining']))}"
+        ))
+
+    def measure_latency(self):
+        """Record write-to-repaint delay in milliseconds"""
+        # Files written before startup say nothing about our latency
+        updated_at = self.token_data.get('updated_at')
+        if updated_at is None or updated_at < self.started_at:
+            return
+
+        self.root.update_idletasks()
+        self.renderer.count()
+        self.last_latency_ms = (time.time() - updated_at) * 1000
+        metrics.observe('tokenhud_update_latency_seconds', self.last_latency_ms / 1000)
+        if self.report_latency:
+            print(f"Update latency: {self.last_latency_ms:.1f} ms ({self.reader.mode})")
 
     def start_move(self, event):
         self.x = event.x
         self.y = event.y
 
     def on_move(self, event):
+        start = time.perf_counter()
         deltax = event.x - self.x
         deltay = event.y - self.y
         x = self.root.winfo_x() + deltax
         y = self.root.winfo_y() + deltay
         self.root.geometry(f"+{x}+{y}")
+        self.frame_timer.record(start)
 
     def run(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+            # The reader flushes pending snapshots before it exits
+            self.reader.stop()
+            metrics.close()
+            if self.exporter is not None:
+                self.exporter.write()
+            if self.profiler is not None:
+                self.dump_profile()
+            if self.report_frames:
+                print(f"Frame times: {self.frame_timer.summary()}")
+                print(f"Rendering: {self.renderer.summary()}")
+            if self.report_wakeups:
+                print(f"Wakeups: {self.scheduler.summary()}")
 
 def main():
-    hud = TokenHUD()
+    try:
+        commands, flags = parse_commands(sys.argv[1:])
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(2)
+
+    # Only one HUD per user; later launches hand their commands to it
+    lock = acquire_instance_lock()
+    if lock is None:
+        for command, args in commands or [('show', [])]:
+            if not forward_command(command, *args):
+                print("Error: a Token HUD holds the lock but is not answering")
+                sys.exit(1)
+        return
+
+    hud = TokenHUD(
+        report_latency='--latency' in flags,
+        use_shm='--shm' in flags,
+        show_sessions='--sessions' in flags,
+        ingest='--ingest' in flags,
+        report_frames='--frame-times' in flags,
+        canvas='--canvas' in flags,
+        report_wakeups='--wakeups' in flags,
+        metrics_file='--metrics' in flags,
+        metrics_http='--metrics-http' in flags,
+        profile='--profile' in flags
+    )
+    for command, args in commands:
+        hud.run_command(command, args)
     hud.run()
+    lock.close()
 
 if __name__ == '__main__':
     main()
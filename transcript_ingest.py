@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Incremental usage ingestion from Claude Code transcripts
+Tails ~/.claude/projects/*/*.jsonl, reading only bytes appended since the
+last run, and reports the token usage of each assistant message
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+from update_tokens import update_token_count
+
+PROJECTS_DIR = Path.home() / '.claude' / 'projects'
+STATE_FILE = Path.home() / '.claude' / 'token_hud_ingest.json'
+
+# Context window the per-session usage is measured against
+CONTEXT_LIMIT = 200000
+
+# Appended data is processed in bounded chunks, never slurped whole
+CHUNK_SIZE = 1 << 20
+
+# Moved offsets are saved at most this often; flush() saves the rest on exit
+STATE_SAVE_INTERVAL = 5.0
+
+USAGE_FIELDS = (
+    'input_tokens',
+    'output_tokens',
+    'cache_creation_input_tokens',
+    'cache_read_input_tokens'
+)
+
+def parse_usage_line(line, project):
+    """Return a usage record for an assistant transcript line, or None"""
+    # Cheap byte test first; most transcript lines carry no usage at all
+    if b'"usage"' not in line:
+        return None
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+
+    message = entry.get('message')
+    if entry.get('type') != 'assistant' or not isinstance(message, dict):
+        return None
+    usage = message.get('usage')
+    if not isinstance(usage, dict):
+        return None
+
+    record = {field: int(usage.get(field) or 0) for field in USAGE_FIELDS}
+    record['context'] = sum(record[field] for field in USAGE_FIELDS)
+    record['session'] = entry.get('sessionId') or 'unknown'
+    record['project'] = project
+    record['timestamp'] = entry.get('timestamp')
+    record['message_id'] = message.get('id')
+    return record
+
+def find_transcripts(projects_dir=PROJECTS_DIR):
+    """Yield (path, stat) for every transcript under the projects dir"""
+    try:
+        projects = os.scandir(projects_dir)
+    except FileNotFoundError:
+        return
+
+    with projects:
+        for project in projects:
+            if not project.is_dir():
+                continue
+            with os.scandir(project.path) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.jsonl'):
+                        yield entry.path, entry.stat()
+
+class TranscriptTailer:
+    """Remember how far each transcript was read and resume from there
+
+    Files are identified by (st_dev, st_ino) as well as path: a renamed
+    transcript keeps its offset, a new file at an old path starts from zero,
+    and a file that shrank (truncation) is re-read from the start.
+
+    While a transcript grows, the state is written at most every
+    save_interval seconds; call flush() before exiting to save the rest.
+    """
+
+    def __init__(self, projects_dir=PROJECTS_DIR, state_file=STATE_FILE,
+                 save_interval=STATE_SAVE_INTERVAL):
+        self.projects_dir = Path(projects_dir)
+        self.state_file = Path(state_file)
+        self.save_interval = save_interval
+        self.files = self.load_state()
+        self.dirty = False
+        self.last_save = float('-inf')
+
+    def load_state(self):
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f).get('files', {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Error loading ingest state, starting fresh: {e}")
+            return {}
+
+    def save_state(self):
+        """Replace the state file atomically, compact since it is rewritten often"""
+        tmp_file = self.state_file.with_name(f".{self.state_file.name}.{os.getpid()}.tmp")
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_file, 'w') as f:
+                json.dump({'files': self.files}, f, separators=(',', ':'))
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            print(f"Error saving ingest state: {e}")
+            return
+        self.dirty = False
+        self.last_save = time.monotonic()
+
+    def flush(self):
+        """Save offsets that moved since the last save"""
+        if self.dirty:
+            self.save_state()
+
+    def transcripts(self):
+        return find_transcripts(self.projects_dir)
+
+    def resume_state(self, path, st, by_inode):
+        """Return the saved state for this file, following renames"""
+        identity = [st.st_dev, st.st_ino]
+        state = self.files.get(path)
+
+        if state is None or state['inode'] != identity:
+            # Rotated: the same inode may have been read under another name
+            state = by_inode.get(tuple(identity)) or {'inode': identity, 'offset': 0}
+
+        # Copy so poll() can tell whether anything moved on
+        state = dict(state)
+
+        if st.st_size < state['offset']:
+            # Truncated in place
+            state = {'inode': identity, 'offset': 0}
+        return state
+
+    def poll(self):
+        """Read newly appended transcript lines and return their usage records"""
+        by_inode = {tuple(s['inode']): s for s in self.files.values()}
+        seen = {}
+        records = []
+
+        for path, st in self.transcripts():
+            state = self.resume_state(path, st, by_inode)
+            seen[path] = state
+            if st.st_size > state['offset']:
+                project = os.path.basename(os.path.dirname(path))
+                records.extend(self.read_appended(path, state, project))
+
+        if seen != self.files:
+            self.dirty = True
+        self.files = seen
+        if self.dirty and time.monotonic() - self.last_save >= self.save_interval:
+            self.save_state()
+        return records
+
+    def read_appended(self, path, state, project):
+        """Parse complete lines after the saved offset and advance it
+
+        A trailing partial line is left for the next poll.
+        """
+        records = []
+        last_id = state.get('last_message_id')
+
+        with open(path, 'rb') as f:
+            f.seek(state['offset'])
+            pending = b''
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                lines = (pending + chunk).split(b'\n')
+                pending = lines.pop()
+                for line in lines:
+                    state['offset'] += len(line) + 1
+                    record = parse_usage_line(line, project)
+
+                    # Streaming writes repeat a message's usage on several lines
+                    if record is None or (last_id and record['message_id'] == last_id):
+                        continue
+                    last_id = record['message_id']
+                    records.append(record)
+
+        state['last_message_id'] = last_id
+        return records
+
+def latest_by_session(records):
+    """Most recent record per session; its context is the session's usage"""
+    latest = {}
+    for record in records:
+        latest[record['session']] = record
+    return latest
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Feed Claude Code transcript usage into the Token HUD"
+    )
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help="keep polling at this interval instead of exiting")
+    parser.add_argument('--total', type=int, default=CONTEXT_LIMIT,
+                        help=f"context window size (default: {CONTEXT_LIMIT})")
+    args = parser.parse_args()
+
+    tailer = TranscriptTailer()
+    try:
+        while True:
+            for session, record in latest_by_session(tailer.poll()).items():
+                update_token_count(record['context'], args.total, session)
+            if args.watch is None:
+                break
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tailer.flush()
+
+if __name__ == '__main__':
+    main()
@@ -4,40 +4,572 @@ Update token count for the HUD widget
 Can be called manually or integrated into Claude Code
 """
 
+import argparse
+import fcntl
 import json
+import multiprocessing
+import os
+import select
+import signal
+import stat
 import sys
+import tempfile
+import time
 from pathlib import Path
 
-def update_token_count(used, total=200000):
-    """Update the token status file"""
-    status_file = Path.home() / '.claude' / 'token_status.json'
-    status_file.parent.mkdir(parents=True, exist_ok=True)
+from hud_metrics import METRICS_DIR, TextfileExporter
+from hud_metrics import registry as metrics
+from hud_socket import HUDClient
+from sessions import SESSIONS_DIR, safe_session_id, session_file
+from status_line import write_snapshot
+from status_shm import StatusSegment
+from usage_log import UsageLog
+
+STATUS_FILE = Path.home() / '.claude' / 'token_status.json'
+
+# Per-writer journals and the merged state they are folded into
+JOURNAL_DIR = Path.home() / '.claude' / 'token_journal'
+
+# Reused across calls so in-process reporters keep one open connection
+_client = None
+
+# Shared-memory segment, attached lazily; False once we know there is none
+_segment = None
+
+# Durable history of every update, opened on first use
+_log = None
+
+# This process's status journal, opened on first use
+_journal = None
+
+# Daemon mode persists at most this many coalesced snapshots per second
+DAEMON_MAX_WRITES = 10
 
+def build_status(used, total=200000, updated_at=None):
+    """Build the status dict the HUD and other readers expect"""
     remaining = total - used
     percentage = (remaining / total) * 100 if total > 0 else 0
 
-    data = {
+    return {
         'used': used,
         'total': total,
         'remaining': remaining,
-        'percentage': percentage
+        'percentage': percentage,
+        'updated_at': time.time() if updated_at is None else updated_at
     }
 
-    with open(status_file, 'w') as f:
+def write_status_file(data, status_file=STATUS_FILE):
+    """Replace the status file atomically so readers never see a partial write"""
+    status_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = status_file.with_name(f".{status_file.name}.{os.getpid()}.tmp")
+
+    with open(tmp_file, 'w') as f:
         json.dump(data, f, indent=2)
+    os.replace(tmp_file, status_file)
+
+    # 'tokenhud status' reads a binary copy of the main status, not the JSON
+    if status_file == STATUS_FILE:
+        write_snapshot(data)
+
+def push_token_count(used, total=200000, updated_at=None, session=None):
+    """Push an update to a running HUD; returns False if none is listening"""
+    global _client
+    if _client is None:
+        _client = HUDClient()
+    return _client.send(used, total, updated_at, session)
+
+def publish_shm(data):
+    """Publish to the shared-memory segment if a HUD created one"""
+    global _segment
+    if _segment is None:
+        _segment = StatusSegment.open_existing() or False
+    if _segment:
+        _segment.publish_status(data)
+
+def append_log(data, session=None):
+    """Record the update in the append-only usage log"""
+    global _log
+    if _log is None:
+        _log = UsageLog()
+    try:
+        _log.append_status(data, session)
+    except OSError as e:
+        print(f"Error appending to usage log: {e}")
+
+class StatusJournal:
+    """Lossless multi-writer updates to the status files
+
+    Each writer process appends its updates to its own journal file, so
+    writers never contend with each other. Whoever then wins a non-blocking
+    flock on merge.lock folds every journal into the merged state, bumps its
+    version and rewrites the changed status files atomically; writers that
+    lose the race leave their records to the merger on duty, which checks
+    for stragglers again after unlocking. 'set' records older than the
+    session's current state are skipped, 'add' records always apply.
+    Updates pushed to a listening HUD are journaled too, so an 'add' is
+    applied to the latest count; the HUD merges them with its snapshots.
+    """
+
+    def __init__(self, journal_dir=JOURNAL_DIR, status_file=STATUS_FILE, sessions_dir=SESSIONS_DIR):
+        self.journal_dir = Path(journal_dir)
+        self.status_file = Path(status_file)
+        self.sessions_dir = Path(sessions_dir)
+        self.state_file = self.journal_dir / 'merged.json'
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self.lock_fd = os.open(self.journal_dir / 'merge.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        self.fd = None
+
+    def open_journal(self):
+        """Open this process's journal, holding a shared lock while it lives
+
+        The merger only deletes a journal it can lock exclusively; if it got
+        there between our open and our lock, the file is gone and we retry.
+        """
+        path = self.journal_dir / f"{os.getpid()}.journal"
+        while True:
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            if os.fstat(fd).st_nlink:
+                self.fd = fd
+                return
+            os.close(fd)
+
+    def append(self, data, session=None, op='set'):
+        """Journal one update; a single O_APPEND write, never interleaved"""
+        if self.fd is None:
+            self.open_journal()
+        record = {
+            'op': op,
+            'session': session,
+            'used': data['used'],
+            'total': data['total'],
+            'updated_at': data['updated_at']
+        }
+        os.write(self.fd, (json.dumps(record, separators=(',', ':')) + '\n').encode())
+
+    def load_state(self):
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'version': 0, 'applied': 0, 'offsets': {}, 'sessions': {}}
+
+    def save_state(self, state):
+        tmp_file = self.state_file.with_name(f".{self.state_file.name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump(state, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.state_file)
+
+    def journals(self):
+        return self.journal_dir.glob('*.journal')
+
+    def pending(self, state=None):
+        """True if any journal holds records the merged state has not seen"""
+        offsets = (state or self.load_state())['offsets']
+        for path in self.journals():
+            try:
+                if path.stat().st_size > offsets.get(path.name, 0):
+                    return True
+            except FileNotFoundError:
+                continue
+        return False
+
+    def merge(self):
+        """Fold pending journals into the status files
+
+        Returns the merged version, or None if another process is merging
+        (it will pick up our records).
+        """
+        version = None
+        while True:
+            try:
+                fcntl.flock(self.lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return version
+            try:
+                state = self.merge_locked()
+                version = state['version']
+            finally:
+                fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+
+            # A writer that appended while we held the lock gave up on it
+            if not self.pending(state):
+                return version
+
+    def merge_locked(self):
+        state = self.load_state()
+        offsets = state['offsets']
+        records = []
+
+        for path in self.journals():
+            offset = offsets.get(path.name, 0)
+            try:
+                with open(path, 'rb') as f:
+                    f.seek(offset)
+                    chunk = f.read()
+            except FileNotFoundError:
+                continue
+            # A record is complete once its newline is there
+            end = chunk.rfind(b'\n') + 1
+            for line in chunk[:end].splitlines():
+                try:
+                    records.append(json.loads(line))
+                except ValueError as e:
+                    print(f"Error in journal {path.name}: {e}")
+            offsets[path.name] = offset + end
+
+        records.sort(key=lambda record: record['updated_at'])
+        changed = set()
+        for record in records:
+            key = record['session'] or ''
+            current = state['sessions'].get(key)
+            if record['op'] == 'add':
+                used = record['used'] + (current['used'] if current else 0)
+            elif current is None or record['updated_at'] >= current['updated_at']:
+                used = record['used']
+            else:
+                continue
+            updated_at = max(record['updated_at'], current['updated_at'] if current else 0)
+            state['sessions'][key] = build_status(used, record['total'], updated_at)
+            changed.add(key)
 
-    print(f"Token count updated: {remaining:,} remaining ({percentage:.1f}%)")
+        if records:
+            state['version'] += 1
+            state['applied'] += len(records)
+            for key in changed:
+                state['sessions'][key]['version'] = state['version']
+            self.save_state(state)
+            for key in changed:
+                target = session_file(key, self.sessions_dir) if key else self.status_file
+                write_status_file(state['sessions'][key], target)
+
+        self.remove_finished(state)
+        return state
+
+    def remove_finished(self, state):
+        """Delete fully merged journals whose writer has exited"""
+        offsets = state['offsets']
+        removed = False
+        for path in self.journals():
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            try:
+                if os.fstat(fd).st_size == offsets.get(path.name, 0):
+                    path.unlink()
+                    offsets.pop(path.name, None)
+                    removed = True
+            finally:
+                os.close(fd)
+        if removed:
+            self.save_state(state)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        os.close(self.lock_fd)
+
+def status_journal():
+    global _journal
+    if _journal is None:
+        _journal = StatusJournal()
+    return _journal
+
+def journal_status(data, session=None, op='set'):
+    """Journal an update and merge it into the status files"""
+    journal = status_journal()
+    journal.append(data, session, op)
+    return journal.merge()
+
+def publish_status(data, session=None):
+    """Deliver one status to shm, the running HUD (or the status files) and the log"""
+    start = time.perf_counter()
+    if session is None:
+        publish_shm(data)
+    append_log(data, session)
+
+    # Every update is journaled, so the merged state that --add builds on
+    # never misses one. A listening HUD merges on its snapshot timer.
+    journal = status_journal()
+    journal.append(data, session)
+    path = 'push'
+    if not push_token_count(data['used'], data['total'], data['updated_at'], session):
+        journal.merge()
+        path = 'journal'
+    metrics.since('tokenhud_write_seconds', start, path=path)
+
+def update_token_count(used, total=200000, session=None, add=False):
+    """Update the running HUD, or the status file when no HUD is listening
+
+    With a session ID the update is keyed to that session and lands in
+    ~/.claude/token_sessions/<session>.json instead of token_status.json.
+    With add=True, used is a delta merged onto the session's journaled count;
+    a listening HUD picks the result up from the status file.
+    """
+    if session is not None:
+        session = safe_session_id(session)
+    data = build_status(used, total)
+    if add:
+        journal_status(data, session, op='add')
+        print(f"Token count increased by {used:,}")
+        return
+    publish_status(data, session)
+
+    print(f"Token count updated: {data['remaining']:,} remaining ({data['percentage']:.1f}%)")
+
+def parse_update_line(line, default_total=200000):
+    """Parse 'used [total] [session]' or a JSON object; returns (data, session) or None"""
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    try:
+        if line.startswith('{'):
+            entry = json.loads(line)
+            used = int(entry['used'])
+            total = int(entry.get('total', default_total))
+            session = entry.get('session')
+        else:
+            fields = line.split()
+            used = int(fields[0])
+            total = int(fields[1]) if len(fields) > 1 else default_total
+            session = fields[2] if len(fields) > 2 else None
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise ValueError(f"bad update line: {line[:80]!r}")
+    if session is not None:
+        session = safe_session_id(str(session))
+    return build_status(used, total), session
+
+def open_source(fifo=None):
+    """File descriptor to read updates from: stdin, or a FIFO created on demand
+
+    The FIFO is opened read-write so it never reports EOF when the last
+    writer goes away; the daemon keeps running until it is signalled.
+    """
+    if fifo is None:
+        return sys.stdin.fileno()
+    fifo = Path(fifo)
+    if not fifo.exists():
+        fifo.parent.mkdir(parents=True, exist_ok=True)
+        os.mkfifo(fifo, 0o600)
+    elif not stat.S_ISFIFO(fifo.stat().st_mode):
+        raise OSError(f"{fifo} exists and is not a FIFO")
+    return os.open(fifo, os.O_RDWR | os.O_NONBLOCK)
+
+def run_daemon(fd, max_writes=DAEMON_MAX_WRITES, default_total=200000, exporter=None):
+    """Read updates from fd until EOF or SIGTERM, persisting at most max_writes per second
+
+    Between flushes only the newest update per session is kept, so a burst
+    of hook calls costs one snapshot. Returns (received, persisted, rejected).
+    An optional TextfileExporter is refreshed after flushes and on exit.
+    """
+    interval = 1.0 / max_writes
+    pending = {}
+    buffer = b''
+    received = persisted = rejected = 0
+    last_flush = 0.0
+
+    def flush():
+        nonlocal persisted, last_flush
+        for session, data in pending.items():
+            publish_status(data, session)
+            persisted += 1
+        pending.clear()
+        last_flush = time.monotonic()
+        if exporter is not None:
+            exporter.maybe_write()
+
+    # SIGTERM stops the loop the same way Ctrl-C does, after a final flush
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        while True:
+            timeout = None
+            if pending:
+                timeout = max(0.0, last_flush + interval - time.monotonic())
+            readable, _, _ = select.select([fd], [], [], timeout)
+
+            if readable:
+                try:
+                    chunk = os.read(fd, 65536)
+                except BlockingIOError:
+                    chunk = None
+                if chunk == b'':
+                    break
+                if chunk:
+                    lines = (buffer + chunk).split(b'\n')
+                    buffer = lines.pop()
+                    for line in lines:
+                        try:
+                            update = parse_update_line(line.decode('utf-8', 'replace'), default_total)
+                        except ValueError as e:
+                            print(f"Error: {e}", file=sys.stderr)
+                            metrics.inc('tokenhud_errors_total', source='daemon')
+                            rejected += 1
+                            continue
+                        if update is not None:
+                            data, session = update
+                            pending[session] = data
+                            received += 1
+
+            if pending and time.monotonic() - last_flush >= interval:
+                flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Whatever arrived last is never dropped
+        if buffer.strip():
+            try:
+                update = parse_update_line(buffer.decode('utf-8', 'replace'), default_total)
+                if update is not None:
+                    pending[update[1]] = update[0]
+                    received += 1
+            except ValueError:
+                metrics.inc('tokenhud_errors_total', source='daemon')
+                rejected += 1
+        flush()
+        if exporter is not None:
+            exporter.write()
+    return received, persisted, rejected
+
+def stress_writer(journal_dir, status_file, sessions_dir, writer, updates):
+    journal = StatusJournal(journal_dir, status_file, sessions_dir)
+    for i in range(updates):
+        journal.append(build_status(1, 10 ** 9), 'shared', op='add')
+        journal.append(build_status(i + 1, 10 ** 9), f"writer-{writer}")
+        journal.merge()
+    journal.close()
+
+def stress_reader(status_file, stop, result):
+    """Re-read the shared status file as fast as possible, counting bad reads"""
+    reads = torn = regressions = 0
+    last_version = 0
+    while not stop.is_set():
+        try:
+            with open(status_file, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            continue
+        except ValueError:
+            torn += 1
+            continue
+        reads += 1
+        if data['version'] < last_version:
+            regressions += 1
+        last_version = data['version']
+    result.put((reads, torn, regressions))
+
+def stress_test(writers=64, updates=200):
+    """Hammer one journal directory from many processes and check nothing is lost"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        journal_dir = Path(tmp_dir) / 'journal'
+        sessions_dir = Path(tmp_dir) / 'sessions'
+        shared_file = session_file('shared', sessions_dir)
+        StatusJournal(journal_dir, Path(tmp_dir) / 'status.json', sessions_dir).close()
+
+        stop = multiprocessing.Event()
+        result = multiprocessing.Queue()
+        reader = multiprocessing.Process(target=stress_reader, args=(shared_file, stop, result))
+        reader.start()
+
+        start = time.perf_counter()
+        processes = [
+            multiprocessing.Process(
+                target=stress_writer,
+                args=(journal_dir, Path(tmp_dir) / 'status.json', sessions_dir, n, updates)
+            )
+            for n in range(writers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        reads, torn, regressions = result.get()
+        reader.join()
+
+        journal = StatusJournal(journal_dir, Path(tmp_dir) / 'status.json', sessions_dir)
+        journal.merge()
+        state = journal.load_state()
+        journal.close()
+        leftover = len(list(journal_dir.glob('*.journal')))
+
+        with open(shared_file, 'r') as f:
+            shared = json.load(f)
+        wrong_writers = sum(
+            1 for n in range(writers)
+            if state['sessions'].get(f"writer-{n}", {}).get('used') != updates
+        )
+
+    expected = writers * updates
+    print(f"Writers:          {writers} processes x {updates} updates x 2 sessions")
+    print(f"Elapsed:          {elapsed:.2f} s ({2 * expected / elapsed:,.0f} updates/s)")
+    print(f"Applied:          {state['applied']:,} of {2 * expected:,} journaled records")
+    print(f"Shared counter:   {shared['used']:,} (expected {expected:,})")
+    print(f"Writer sessions:  {writers - wrong_writers} of {writers} at their last value")
+    print(f"Merged version:   {state['version']:,}, {leftover} journals left over")
+    print(f"Concurrent reads: {reads:,}, {torn} partial, {regressions} version regressions")
+
+    ok = (state['applied'] == 2 * expected and shared['used'] == expected
+          and not wrong_writers and not torn and not regressions)
+    print("PASS" if ok else "FAIL")
+    return ok
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: update_tokens.py <used_tokens> [total_tokens]")
-        print("Example: update_tokens.py 25000 200000")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Update token count for the HUD widget",
+        epilog="Example: update_tokens.py 25000 200000 --session my-project"
+    )
+    parser.add_argument('used', type=int, nargs='?', help="tokens used so far")
+    parser.add_argument('total', type=int, nargs='?', default=200000,
+                        help="token budget (default: 200000)")
+    parser.add_argument('--session', help="key the update to this session ID")
+    parser.add_argument('--add', action='store_true',
+                        help="treat 'used' as tokens spent since the last update")
+    parser.add_argument('--daemon', action='store_true',
+                        help="keep running, reading 'used [total] [session]' or JSON lines")
+    parser.add_argument('--fifo', metavar='PATH',
+                        help="read daemon updates from this FIFO instead of stdin")
+    parser.add_argument('--max-writes', type=float, default=DAEMON_MAX_WRITES,
+                        help=f"daemon snapshots persisted per second (default: {DAEMON_MAX_WRITES})")
+    parser.add_argument('--metrics', action='store_true',
+                        help="with --daemon, keep Prometheus metrics in "
+                             "~/.claude/metrics/update_tokens.prom")
+    parser.add_argument('--stress', type=int, metavar='WRITERS',
+                        help="run a concurrent-writer stress test with this many processes")
+    args = parser.parse_args()
+
+    if args.stress:
+        sys.exit(0 if stress_test(args.stress) else 1)
 
-    used = int(sys.argv[1])
-    total = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    if args.daemon or args.fifo:
+        if args.max_writes <= 0:
+            parser.error("--max-writes must be positive")
+        try:
+            fd = open_source(args.fifo)
+        except OSError as e:
+            print(f"Error opening update source: {e}")
+            sys.exit(1)
+        exporter = None
+        if args.metrics:
+            exporter = TextfileExporter(metrics, METRICS_DIR / 'update_tokens.prom')
+        received, persisted, rejected = run_daemon(fd, args.max_writes, args.total, exporter)
+        print(f"Received {received:,} updates, persisted {persisted:,} "
+              f"({received - persisted:,} coalesced, {rejected:,} rejected)", file=sys.stderr)
+        return
 
-    update_token_count(used, total)
+    if args.used is None:
+        parser.error("the 'used' argument is required unless --daemon is given")
+    update_token_count(args.used, args.total, args.session, args.add)
 
 if __name__ == '__main__':
     main()
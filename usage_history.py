@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+In-memory usage history for the Token HUD
+A fixed-capacity ring buffer backed by typed arrays, so memory stays flat
+however long the HUD runs
+"""
+
+from array import array
+
+# Roughly a day of samples at one update every ten seconds
+HISTORY_CAPACITY = 8192
+
+class UsageHistory:
+    """Ring buffer of (timestamp, used, total) samples
+
+    Samples live in three preallocated arrays; appending overwrites the
+    oldest slot once the buffer is full and never allocates.
+    """
+
+    def __init__(self, capacity=HISTORY_CAPACITY):
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.used = array('q', bytes(8 * capacity))
+        self.total = array('q', bytes(8 * capacity))
+        self.start = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, used, total):
+        if self.count < self.capacity:
+            slot = (self.start + self.count) % self.capacity
+            self.count += 1
+        else:
+            slot = self.start
+            self.start = (self.start + 1) % self.capacity
+
+        self.times[slot] = timestamp
+        self.used[slot] = used
+        self.total[slot] = total
+
+    def __getitem__(self, index):
+        """Return sample (timestamp, used, total); 0 is the oldest, -1 the newest"""
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("history index out of range")
+        slot = (self.start + index) % self.capacity
+        return self.times[slot], self.used[slot], self.total[slot]
+
+    def latest(self, n):
+        """Yield up to the n newest samples, oldest first"""
+        for index in range(max(0, self.count - n), self.count):
+            yield self[index]
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Durable append-only usage log for the Token HUD
+Fixed-size binary records in memory-mapped segment files under
+~/.claude/usage_log/, with segment rollover, compaction and timestamp
+range queries that never load the whole log
+
+Segment layout (little-endian):
+    header  64 bytes: magic, record count, flags
+    records 48 bytes each: timestamp, used, total, remaining, percentage,
+            session hash (0 for unkeyed updates)
+"""
+
+import argparse
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import time
+from pathlib import Path
+
+LOG_DIR = Path.home() / '.claude' / 'usage_log'
+
+MAGIC = b'TKHUDLG1'
+_HEADER = struct.Struct('<8sQQ')
+HEADER_SIZE = 64
+_RECORD = struct.Struct('<dqqqdQ')
+RECORD_SIZE = _RECORD.size
+
+# 64k records (3 MiB) per segment before rolling over to the next file
+RECORDS_PER_SEGMENT = 65536
+SEGMENT_SIZE = HEADER_SIZE + RECORDS_PER_SEGMENT * RECORD_SIZE
+
+FLAG_COMPACTED = 1
+
+# Sealed segments older than this are downsampled to one record per bucket
+COMPACT_AFTER = 7 * 24 * 3600
+COMPACT_RESOLUTION = 60
+
+def session_hash(session):
+    """Stable 64-bit key for a session ID; 0 means unkeyed"""
+    if session is None:
+        return 0
+    return int.from_bytes(hashlib.blake2b(session.encode(), digest_size=8).digest(), 'little') or 1
+
+def segment_name(number):
+    return f"segment-{number:06d}.log"
+
+def segment_number(path):
+    return int(path.stem.split('-')[1])
+
+class Segment:
+    """One mapped segment file"""
+
+    def __init__(self, path, create=False):
+        self.path = Path(path)
+        flags = os.O_RDWR | (os.O_CREAT | os.O_EXCL if create else 0)
+        self.fd = os.open(self.path, flags, 0o600)
+
+        # Whoever gets here first after creation sizes the file and writes
+        # the header; the lock keeps a racing opener from doing it twice
+        if create or os.fstat(self.fd).st_size < HEADER_SIZE:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self.fd).st_size < HEADER_SIZE:
+                    os.ftruncate(self.fd, SEGMENT_SIZE)
+                    os.pwrite(self.fd, _HEADER.pack(MAGIC, 0, 0), 0)
+            finally:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+        size = os.fstat(self.fd).st_size
+        self.mm = mmap.mmap(self.fd, size)
+        self.capacity = (size - HEADER_SIZE) // RECORD_SIZE
+        if self.mm[:8] != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a usage log segment")
+
+    def count(self):
+        return _HEADER.unpack_from(self.mm, 0)[1]
+
+    def flags(self):
+        return _HEADER.unpack_from(self.mm, 0)[2]
+
+    def record(self, index):
+        return _RECORD.unpack_from(self.mm, HEADER_SIZE + index * RECORD_SIZE)
+
+    def timestamp(self, index):
+        return struct.unpack_from('<d', self.mm, HEADER_SIZE + index * RECORD_SIZE)[0]
+
+    def bisect(self, timestamp, count):
+        """Index of the first record at or after timestamp"""
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp(mid) < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def close(self):
+        self.mm.close()
+        os.close(self.fd)
+
+class UsageLog:
+    """Append and query status snapshots
+
+    Appends take an flock on the active segment, so any number of writer
+    processes can share the log; readers take no locks because the record
+    count is only bumped after the record itself is in place. Timestamps are
+    clamped to be non-decreasing, which keeps every segment sorted for
+    binary search.
+    """
+
+    def __init__(self, log_dir=LOG_DIR):
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.active = None
+
+    def segments(self):
+        return sorted(self.log_dir.glob('segment-*.log'), key=segment_number)
+
+    def _open_active(self):
+        paths = self.segments()
+        if paths:
+            self.active = Segment(paths[-1])
+        else:
+            self._roll_over(0)
+
+    def _roll_over(self, number):
+        """Switch to segment number + 1, creating it unless another writer did"""
+        path = self.log_dir / segment_name(number + 1)
+        try:
+            segment = Segment(path, create=True)
+        except FileExistsError:
+            segment = Segment(path)
+        if self.active is not None:
+            self.active.close()
+        self.active = segment
+
+    def append(self, timestamp, used, total, remaining, percentage, session=None):
+        if self.active is None:
+            self._open_active()
+
+        while True:
+            segment = self.active
+            fcntl.flock(segment.fd, fcntl.LOCK_EX)
+            try:
+                count = segment.count()
+                if count < segment.capacity:
+                    if count:
+                        timestamp = max(timestamp, segment.timestamp(count - 1))
+                    _RECORD.pack_into(
+                        segment.mm, HEADER_SIZE + count * RECORD_SIZE,
+                        timestamp, used, total, remaining, percentage,
+                        session_hash(session)
+                    )
+                    _HEADER.pack_into(segment.mm, 0, MAGIC, count + 1, segment.flags())
+                    return
+            finally:
+                fcntl.flock(segment.fd, fcntl.LOCK_UN)
+
+            # Full: follow (or start) the next segment and try again there
+            self._roll_over(segment_number(segment.path))
+
+    def append_status(self, data, session=None):
+        self.append(
+            data['updated_at'], data['used'], data['total'],
+            data['remaining'], data['percentage'], session
+        )
+
+    def range(self, start=float('-inf'), end=float('inf'), session=...):
+        """Yield records with start <= timestamp < end, oldest first
+
+        Pass session=None for unkeyed records or a session ID to filter;
+        the default yields every record. Segments outside the range are
+        skipped after reading two timestamps.
+        """
+        key = None if session is ... else session_hash(session)
+        for path in self.segments():
+            try:
+                segment = Segment(path)
+            except (OSError, ValueError):
+                continue
+            try:
+                count = segment.count()
+                if not count or segment.timestamp(count - 1) < start or segment.timestamp(0) >= end:
+                    continue
+                index = segment.bisect(start, count)
+                while index < count:
+                    record = segment.record(index)
+                    if record[0] >= end:
+                        return
+                    if key is None or record[5] == key:
+                        yield record
+                    index += 1
+            finally:
+                segment.close()
+
+    def read_after(self, cursor=None):
+        """Yield (cursor, record) for every record after cursor, oldest first
+
+        A cursor is (segment number, records read, segment flags, timestamp),
+        taken from the last pair a previous call yielded; None starts at the
+        beginning. Positions are per segment, so timestamps clamped only
+        within a segment do not matter. If the cursor's segment has been
+        compacted since, its records moved, and reading resumes after the
+        cursor's timestamp instead.
+        """
+        number, position, flags, timestamp = cursor or (0, 0, 0, float('-inf'))
+        for path in self.segments():
+            current = segment_number(path)
+            if current < number:
+                continue
+            try:
+                segment = Segment(path)
+            except (OSError, ValueError):
+                continue
+            try:
+                count = segment.count()
+                current_flags = segment.flags()
+                if current > number:
+                    index = 0
+                elif current_flags == flags:
+                    index = position
+                else:
+                    index = segment.bisect(timestamp, count)
+                    while index < count and segment.timestamp(index) <= timestamp:
+                        index += 1
+                while index < count:
+                    record = segment.record(index)
+                    index += 1
+                    yield (current, index, current_flags, record[0]), record
+            finally:
+                segment.close()
+
+    def tail(self, n, session=None):
+        """Return up to the n newest records for one session, oldest first"""
+        key = session_hash(session)
+        records = []
+        for path in reversed(self.segments()):
+            segment = Segment(path)
+            try:
+                for index in range(segment.count() - 1, -1, -1):
+                    record = segment.record(index)
+                    if record[5] == key:
+                        records.append(record)
+                        if len(records) == n:
+                            return records[::-1]
+            finally:
+                segment.close()
+        return records[::-1]
+
+    def compact(self, older_than=COMPACT_AFTER, resolution=COMPACT_RESOLUTION):
+        """Downsample sealed, old segments to one record per bucket per session
+
+        The newest record in each bucket is kept. Compacted segments are
+        rewritten to a temp file and renamed over the original.
+        Returns the number of records removed.
+        """
+        cutoff = time.time() - older_than
+        removed = 0
+
+        for path in self.segments()[:-1]:
+            segment = Segment(path)
+            try:
+                # Only full segments are sealed; writers never touch them again
+                count = segment.count()
+                if (segment.flags() & FLAG_COMPACTED or count < segment.capacity
+                        or segment.timestamp(count - 1) >= cutoff):
+                    continue
+                kept = {}
+                for index in range(count):
+                    record = segment.record(index)
+                    kept[(record[5], int(record[0] // resolution))] = record
+            finally:
+                segment.close()
+
+            records = sorted(kept.values())
+            fd, tmp_name = tempfile.mkstemp(dir=self.log_dir, prefix='.compact-')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_HEADER.pack(MAGIC, len(records), FLAG_COMPACTED).ljust(HEADER_SIZE, b'\0'))
+                for record in records:
+                    f.write(_RECORD.pack(*record))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_name, path)
+            removed += count - len(records)
+
+        return removed
+
+    def flush(self):
+        """Push the active segment to disk"""
+        if self.active is not None:
+            self.active.mm.flush()
+
+    def close(self):
+        if self.active is not None:
+            self.active.mm.flush()
+            self.active.close()
+            self.active = None
+
+def benchmark(appends=200000):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log = UsageLog(tmp_dir)
+        now = time.time()
+
+        start = time.perf_counter()
+        for i in range(appends):
+            log.append(now + i, i, 200000, 200000 - i, 50.0)
+        append_us = (time.perf_counter() - start) / appends * 1e6
+
+        start = time.perf_counter()
+        hits = sum(1 for _ in log.range(now + appends // 2, now + appends // 2 + 1000))
+        range_ms = (time.perf_counter() - start) * 1000
+        segments = len(log.segments())
+        log.close()
+
+    print(f"Appends:     {appends:,} across {segments} segments")
+    print(f"Append cost: {append_us:.2f} µs/record")
+    print(f"Range query: {hits} records in {range_ms:.2f} ms")
+
+def parse_time(value):
+    """Epoch seconds, or seconds relative to now when zero or negative"""
+    value = float(value)
+    return time.time() + value if value <= 0 else value
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or maintain the Token HUD usage log")
+    parser.add_argument('--range', nargs=2, metavar=('START', 'END'), type=parse_time,
+                        help="print records in [START, END); 0 or negative means relative to now")
+    parser.add_argument('--session', help="only records for this session ID")
+    parser.add_argument('--compact', action='store_true', help="compact old sealed segments")
+    parser.add_argument('--bench', action='store_true', help="measure append and query cost")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark()
+        return
+
+    log = UsageLog()
+    if args.compact:
+        print(f"Removed {log.compact():,} records")
+    if args.range:
+        session = ... if args.session is None else args.session
+        for timestamp, used, total, remaining, percentage, key in log.range(*args.range, session=session):
+            stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+            print(f"{stamp}  {used:>9,} / {total:,}  ({percentage:.1f}% remaining)  {key:016x}")
+
+if __name__ == '__main__':
+    main()
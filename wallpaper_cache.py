@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of generated wallpapers
+Images are stored once under their SHA-256 and looked up by a hash of the
+request (model, prompt, size, quality), so rerunning a generator with
+unchanged prompts copies files instead of paying for new images
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'forest_wallpapers'
+
+# Least recently used images are evicted above this total size
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+def cache_key(model, prompt, size, quality):
+    """Stable hash of everything that determines the generated image"""
+    request = json.dumps(
+        {'model': model, 'prompt': prompt, 'size': size, 'quality': quality},
+        sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(request.encode()).hexdigest()
+
+def link_or_copy(source, dest, link=False):
+    """Copy source to dest (replacing dest); with link=True hard-link it where possible"""
+    dest = Path(dest)
+    tmp_file = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    if link:
+        try:
+            os.link(source, tmp_file)
+        except OSError:
+            link = False  # across filesystems
+    if not link:
+        shutil.copyfile(source, tmp_file)
+    os.replace(tmp_file, dest)
+
+class WallpaperCache:
+    """index.json maps request keys to blobs in objects/<sha256>.png
+
+    Safe to share between threads and processes: every index change
+    happens under an exclusive flock and is written atomically. A blob
+    referenced by several keys (identical images) is stored and counted
+    once.
+
+    Images are copied in and out of the cache. With link=True they are
+    hard-linked instead, which saves the copy but shares the inode with
+    the user's file; a blob whose size or mtime no longer matches its
+    entry (edited in place through such a link) is evicted on get().
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, link=False):
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / 'objects'
+        self.index_file = self.cache_dir / 'index.json'
+        self.max_bytes = max_bytes
+        self.link = link
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def locked(self):
+        """Hold the thread lock and the index flock; yields the current index"""
+        with self.lock, open(self.cache_dir / 'index.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield self.load_index()
+
+    def load_index(self):
+        try:
+            with open(self.index_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Error reading cache index, starting empty: {e}")
+            return {}
+
+    def save_index(self, index):
+        fd, tmp_file = tempfile.mkstemp(dir=self.cache_dir, prefix='.index.', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_file, self.index_file)
+
+    def blob(self, sha256):
+        return self.objects_dir / f"{sha256}.png"
+
+    def get(self, key, dest):
+        """Materialize a cached image at dest; returns its entry, or None on a miss"""
+        with self.locked() as index:
+            entry = index.get(key)
+            if entry is None:
+                return None
+            blob = self.blob(entry['sha256'])
+            try:
+                stat = blob.stat()
+                if stat.st_size != entry['bytes'] or stat.st_mtime_ns != entry.get('mtime_ns', stat.st_mtime_ns):
+                    # Modified through a hard link: no longer the image we stored
+                    print(f"Error: cached image {blob.name} was modified, dropping it")
+                    blob.unlink()
+                    raise FileNotFoundError(blob)
+                link_or_copy(blob, dest, self.link)
+            except FileNotFoundError:
+                # Blob removed behind our back: forget every entry using it
+                for name in [name for name, other in index.items() if other['sha256'] == entry['sha256']]:
+                    del index[name]
+                self.save_index(index)
+                return None
+            entry['last_used'] = time.time()
+            self.save_index(index)
+            return entry
+
+    def put(self, key, source, sha256, **params):
+        """Store a finished image under key, then evict down to max_bytes"""
+        with self.locked() as index:
+            blob = self.blob(sha256)
+            if not blob.exists():
+                link_or_copy(source, blob, self.link)
+            stat = blob.stat()
+            now = time.time()
+            index[key] = dict(params, sha256=sha256, bytes=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                              created=now, last_used=now)
+            self.evict(index)
+            self.save_index(index)
+
+    def evict(self, index):
+        """Drop least recently used entries until the blobs fit in max_bytes"""
+        def total():
+            return sum({entry['sha256']: entry['bytes'] for entry in index.values()}.values())
+
+        for key in sorted(index, key=lambda key: index[key]['last_used']):
+            if total() <= self.max_bytes:
+                break
+            del index[key]
+        self.sweep(index)
+
+    def sweep(self, index):
+        """Delete blobs no entry references, e.g. the old image of a key put again"""
+        referenced = {entry['sha256'] for entry in index.values()}
+        for blob in self.objects_dir.glob('*.png'):
+            if blob.stem not in referenced:
+                blob.unlink(missing_ok=True)
+
+    def stats(self):
+        with self.locked() as index:
+            blobs = {entry['sha256']: entry['bytes'] for entry in index.values()}
+            return len(index), len(blobs), sum(blobs.values())
+
+    def clear(self):
+        with self.locked():
+            self.sweep({})
+            self.save_index({})
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the wallpaper cache")
+    parser.add_argument('--clear', action='store_true', help="remove every cached image")
+    args = parser.parse_args()
+
+    cache = WallpaperCache()
+    if args.clear:
+        cache.clear()
+    entries, blobs, size = cache.stats()
+    print(f"{cache.cache_dir}: {entries} requests, {blobs} images, "
+          f"{size / 1024 / 1024:.1f} of {cache.max_bytes / 1024 / 1024:.0f} MB")
+
+if __name__ == '__main__':
+    main()
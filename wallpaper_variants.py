@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Terminal-ready variants of the forest wallpapers
+Every generated 1792x1024 PNG is cropped and downscaled to each monitor
+size, toned down behind terminal text (darkened, or lightened for themes
+that use dark text), optionally blurred, and recompressed as WebP, JPEG
+and PNG in a process pool. Variants are keyed by the source's SHA-256,
+so only new or changed images are rendered again
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from forest_manifest import IMAGES_DIR, MANIFEST_FILE, file_sha256, load_images_info
+
+# Pillow is only needed here; without it the generators still work
+try:
+    from PIL import Image, ImageFilter, ImageOps
+except ImportError:
+    Image = None
+
+VARIANTS_DIR = IMAGES_DIR / "variants"
+
+# Bump when rendering changes so existing variants are redone
+VARIANTS_VERSION = 1
+
+# Common monitor sizes, all below the source resolution; larger sizes are
+# rendered at the largest crop of the source with their aspect ratio
+DEFAULT_SIZES = ('1280x720', '1366x768', '1600x900')
+
+# How far each image is blended toward black (or white, for dark text)
+TONE = 0.35
+
+# Gaussian blur radius in pixels; 0 keeps the image sharp
+BLUR_RADIUS = 1.5
+
+# Format -> (Pillow format, file extension, encoder options)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+    'png': ('PNG', 'png', {'optimize': True}),
+}
+
+def parse_size(text):
+    try:
+        width, height = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise ValueError(f"invalid size {text!r}, expected WIDTHxHEIGHT")
+    if width < 1 or height < 1:
+        raise ValueError(f"invalid size {text!r}")
+    return width, height
+
+def fit_size(source_size, size):
+    """size, or the largest size with its aspect ratio that needs no upscaling"""
+    (source_width, source_height), (width, height) = source_size, size
+    scale = min(1.0, source_width / width, source_height / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def variant_path(image_path, size, fmt, variants_dir=VARIANTS_DIR):
+    """Where the variant of a source image is written"""
+    return Path(variants_dir) / f"{Path(image_path).stem}_{size}.{FORMATS[fmt][1]}"
+
+def variant_key(sha256, size, fmt, tone, blur, lighten):
+    """Hash of the source and every setting that changes the output"""
+    params = json.dumps(
+        {'source': sha256, 'size': size, 'format': FORMATS[fmt], 'tone': tone,
+         'blur': blur, 'lighten': lighten, 'version': VARIANTS_VERSION},
+        sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(params.encode()).hexdigest()
+
+def render_variants(source, size, outputs, tone, blur, lighten):
+    """Render one source at one size in every format; runs in a worker process
+
+    outputs is a list of (format, dest). Returns (format, dest, bytes) for each.
+    """
+    with Image.open(source) as image:
+        image = ImageOps.fit(image.convert('RGB'), fit_size(image.size, parse_size(size)),
+                             method=Image.LANCZOS)
+    if tone > 0:
+        backdrop = Image.new('RGB', image.size, (255, 255, 255) if lighten else (0, 0, 0))
+        image = Image.blend(image, backdrop, tone)
+    if blur > 0:
+        image = image.filter(ImageFilter.GaussianBlur(blur))
+
+    results = []
+    for fmt, dest in outputs:
+        pillow_format, _, options = FORMATS[fmt]
+        tmp_file = Path(dest).with_name(f".{Path(dest).name}.{os.getpid()}.tmp")
+        try:
+            image.save(tmp_file, format=pillow_format, **options)
+            os.replace(tmp_file, dest)
+        except BaseException:
+            tmp_file.unlink(missing_ok=True)
+            raise
+        results.append((fmt, dest, Path(dest).stat().st_size))
+    return results
+
+def load_index(index_file):
+    try:
+        with open(index_file, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Error reading variant index, rendering everything: {e}")
+        return {}
+
+def save_index(index, index_file):
+    fd, tmp_file = tempfile.mkstemp(dir=index_file.parent, prefix='.index.', suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp_file, index_file)
+
+def build_variants(images, sizes=DEFAULT_SIZES, formats=tuple(FORMATS), tone=TONE, blur=BLUR_RADIUS,
+                   workers=None, force=False, variants_dir=VARIANTS_DIR):
+    """Render the variants images (as from load_images_info) lack; returns a summary dict
+
+    Variants whose source hash and settings match the index are skipped
+    unless force=True. Returns None when Pillow is not installed.
+    """
+    if Image is None:
+        print("Error: Pillow is required for wallpaper variants (pip install Pillow)")
+        return None
+
+    variants_dir = Path(variants_dir)
+    variants_dir.mkdir(parents=True, exist_ok=True)
+    index_file = variants_dir / "index.json"
+    index = load_index(index_file)
+
+    # One task per image and size: the source is decoded and resized once,
+    # then encoded in every format that is out of date
+    tasks = []
+    current = []
+    for image in images:
+        source = Path(image['path'])
+        sha256 = file_sha256(source)
+        source_bytes = source.stat().st_size
+        lighten = image['colors'] == 'dark'
+        for size in sizes:
+            outputs = []
+            for fmt in formats:
+                dest = variant_path(source, size, fmt, variants_dir)
+                key = variant_key(sha256, size, fmt, tone, blur, lighten)
+                current.append(dest.name)
+                entry = index.get(dest.name)
+                if (force or entry is None or entry['key'] != key or not dest.exists()
+                        or dest.stat().st_size != entry['bytes']):
+                    index[dest.name] = {'key': key, 'bytes': None, 'source': source.name,
+                                        'source_bytes': source_bytes, 'format': fmt, 'size': size}
+                    outputs.append((fmt, str(dest)))
+            if outputs:
+                tasks.append((str(source), size, outputs, tone, blur, lighten))
+
+    start = time.perf_counter()
+    rendered = failed = 0
+    if tasks:
+        print(f"Rendering {sum(len(task[2]) for task in tasks)} variants "
+              f"with {workers or os.cpu_count()} workers...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(render_variants, *task): task for task in tasks}
+            for future in as_completed(futures):
+                source, size = futures[future][:2]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"  ✗ {Path(source).name} at {size}: {e}")
+                    failed += len(futures[future][2])
+                    continue
+                for fmt, dest, size_bytes in results:
+                    index[Path(dest).name]['bytes'] = size_bytes
+                    rendered += 1
+                print(f"  ✓ {Path(source).name} at {size}")
+
+    # Failed renders stay out of the index so the next run retries them
+    index = {name: entry for name, entry in index.items() if entry['bytes'] is not None}
+    save_index(index, index_file)
+
+    summary = {
+        'rendered': rendered,
+        'skipped': len(current) - rendered - failed,
+        'failed': failed,
+        'seconds': time.perf_counter() - start,
+        'formats': {}
+    }
+    # Each source is counted once per format however many sizes it has;
+    # savings are per variant, against the size of its own source
+    sources = {}
+    for name in current:
+        entry = index.get(name)
+        if entry is None:
+            continue
+        totals = summary['formats'].setdefault(
+            entry['format'], {'count': 0, 'bytes': 0, 'sources': 0, 'source_bytes': 0, 'saved': 0})
+        totals['count'] += 1
+        totals['bytes'] += entry['bytes']
+        totals['saved'] += entry['source_bytes'] - entry['bytes']
+        seen = sources.setdefault(entry['format'], set())
+        if entry['source'] not in seen:
+            seen.add(entry['source'])
+            totals['sources'] += 1
+            totals['source_bytes'] += entry['source_bytes']
+    return summary
+
+def print_summary(summary):
+    print(f"{summary['rendered']} rendered, {summary['skipped']} up to date, "
+          f"{summary['failed']} failed in {summary['seconds']:.1f}s")
+    print(f"{'Format':<8} {'Files':>6} {'Variants':>10} {'Sources':>14} {'Saved':>16}")
+    for fmt, totals in summary['formats'].items():
+        # Percent of what the variants would weigh as full-size originals
+        originals = totals['saved'] + totals['bytes']
+        percent = totals['saved'] / originals * 100 if originals else 0
+        print(f"{fmt:<8} {totals['count']:>6} {totals['bytes'] / 1024 / 1024:>7.1f} MB "
+              f"{totals['sources']:>3} {totals['source_bytes'] / 1024 / 1024:>7.1f} MB "
+              f"{totals['saved'] / 1024 / 1024:>8.1f} MB {percent:>3.0f}%")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render downscaled, toned-down wallpaper variants for each monitor size"
+    )
+    parser.add_argument('--sizes', default=','.join(DEFAULT_SIZES),
+                        help=f"comma-separated WIDTHxHEIGHT list (default: {','.join(DEFAULT_SIZES)})")
+    parser.add_argument('--formats', default=','.join(FORMATS),
+                        help=f"comma-separated subset of {','.join(FORMATS)} (default: all)")
+    parser.add_argument('--tone', type=float, default=TONE,
+                        help=f"blend toward black or white, 0-1 (default: {TONE})")
+    parser.add_argument('--blur', type=float, default=BLUR_RADIUS,
+                        help=f"Gaussian blur radius in pixels (default: {BLUR_RADIUS})")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument('--force', action='store_true', help="render every variant again")
+    parser.add_argument('--output', default=str(VARIANTS_DIR), help=f"default: {VARIANTS_DIR}")
+    args = parser.parse_args()
+
+    try:
+        sizes = [f"{width}x{height}" for width, height in map(parse_size, args.sizes.split(','))]
+    except ValueError as e:
+        parser.error(str(e))
+    formats = args.formats.split(',')
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        parser.error(f"unknown format {unknown[0]!r}")
+    if not 0 <= args.tone <= 1 or args.blur < 0:
+        parser.error("--tone must be between 0 and 1 and --blur not negative")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be positive")
+
+    images = load_images_info()
+    if not images:
+        print(f"Error: No forest images recorded in {MANIFEST_FILE}.")
+        print("Run generate_forest_collection.py first (--resume records images already on disk).")
+        sys.exit(1)
+
+    summary = build_variants(images, sizes, formats, args.tone, args.blur, args.workers,
+                             args.force, args.output)
+    if summary is None:
+        sys.exit(1)
+    print_summary(summary)
+    print(f"Variants: {args.output}")
+    sys.exit(1 if summary['failed'] else 0)
+
+if __name__ == '__main__':
+    main()